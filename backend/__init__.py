@@ -1,14 +1,18 @@
 from flask import Flask
 
 from backend.settings import settings
+from backend.util.json_provider import json_provider
 
 APP = Flask(__name__)
+APP.json = json_provider(APP)
 
 # pylint: disable=wrong-import-position
 import backend.util.request_hooks
 from backend.routes.admin import ADMIN_BP
-from backend.routes.assets import ASSETS_BP
+from backend.routes.assets import ASSETS_BP, build_config_body
+from backend.routes.changes import CHANGES_BP
 from backend.routes.comments import COMMENTS_BP
+from backend.routes.items import ITEMS_BP
 from backend.routes.recommendations import RECOMMENDATIONS_BP
 
 # pylint: enable=wrong-import-position
@@ -21,5 +25,11 @@ def register_blueprint(bp):
 
 register_blueprint(ADMIN_BP)
 register_blueprint(ASSETS_BP)
+register_blueprint(CHANGES_BP)
 register_blueprint(COMMENTS_BP)
+register_blueprint(ITEMS_BP)
 register_blueprint(RECOMMENDATIONS_BP)
+
+# config.json is served on every Jellyfin page load; serialize it up front.
+with APP.test_request_context():
+    build_config_body()
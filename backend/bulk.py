@@ -0,0 +1,385 @@
+"""
+Bulk export and import of recommendations, comments and settings as NDJSON.
+
+One JSON object per line, tagged with a `type`:
+
+    {"type": "settings", "globalLimit": 0}
+    {"type": "userSetting", "userId": "...", "userLimit": 5}
+    {"type": "recommendation", "userId": "...", "itemId": "...",
+     "username": "...", "createdAt": "2025-01-01T12:00:00"}
+    {"type": "comment", "id": 1, "userId": "...", "itemId": "...",
+     "username": "...", "comment": "..."}
+
+Imports upsert: recommendations on (userId, itemId), user settings on
+`userId`. Comments are keyed on their content: one is added, with a new id,
+unless the same user already wrote the same text on the same item. Ids from
+another database mean nothing here, so they are ignored unless `keep_ids` is
+set, for restoring a database from its own export: comments are then
+upserted on `id`. Usernames are taken from the file for users the database
+has no name for, never looked up in Jellyfin; the next username refresh
+corrects them.
+
+    python -m backend.bulk export [FILE] [--tables recommendations,...]
+    python -m backend.bulk import [FILE] [--chunk-size 50000] [--keep-ids]
+
+FILE defaults to stdout/stdin.
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from datetime import datetime, timezone
+
+from sqlalchemy import Connection, bindparam, exists, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from backend.db import ENGINE, init_db
+from backend.helpers import fallback_username
+from backend.logger import logger
+from backend.models import (
+    Comment,
+    Recommendation,
+    Setting,
+    User,
+    UserSetting,
+    select_comments,
+    select_recommendations,
+)
+
+TABLES = ("settings", "recommendations", "comments")
+IMPORT_CHUNK_SIZE = 50_000
+EXPORT_BATCH_SIZE = 5_000
+
+Progress = Callable[[Counter], None]
+
+
+def parse_tables(value: str | None) -> list[str]:
+    if not value:
+        return list(TABLES)
+    tables = [v.strip() for v in value.split(",") if v.strip()]
+    unknown = set(tables) - set(TABLES)
+    if unknown:
+        raise ValueError(f"Unknown tables: {', '.join(sorted(unknown))}")
+    return tables
+
+
+def export_records(
+    conn: Connection, tables: Iterable[str] = TABLES
+) -> Iterator[dict]:
+    """
+    Yield every row of `tables` as an NDJSON record, streaming from the
+    database cursor.
+    """
+    tables = set(tables)
+    conn = conn.execution_options(yield_per=EXPORT_BATCH_SIZE)
+    if "settings" in tables:
+        global_limit = conn.scalar(select(Setting.global_limit).limit(1))
+        yield {"type": "settings", "globalLimit": global_limit or 0}
+        for row in conn.execute(select(UserSetting)):
+            yield {
+                "type": "userSetting",
+                "userId": row.user_id,
+                "userLimit": row.user_limit,
+            }
+    if "recommendations" in tables:
+        for row in conn.execute(
+            select_recommendations()
+            .add_columns(Recommendation.created_at)
+            .order_by(Recommendation.user_id, Recommendation.item_id)
+        ):
+            yield {
+                "type": "recommendation",
+                "userId": row.user_id,
+                "itemId": row.item_id,
+                "username": row.username,
+                "createdAt": (
+                    row.created_at.isoformat() if row.created_at else None
+                ),
+            }
+    if "comments" in tables:
+        for row in conn.execute(select_comments().order_by(Comment.id)):
+            yield {
+                "type": "comment",
+                "id": row.id,
+                "userId": row.user_id,
+                "itemId": row.item_id,
+                "username": row.username,
+                "comment": row.comment,
+            }
+
+
+def export_ndjson(tables: Iterable[str] = TABLES) -> Iterator[str]:
+    with ENGINE.connect() as conn:
+        for record in export_records(conn, tables):
+            yield json.dumps(record, separators=(",", ":")) + "\n"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _parse_datetime(value: str | None) -> datetime:
+    if not value:
+        return _now()
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class _Batch:
+    """
+    Rows parsed from the input, grouped by statement, until the next flush.
+    """
+
+    def __init__(self, keep_ids: bool = False):
+        self.keep_ids = keep_ids
+        self.global_limit: int | None = None
+        self.user_settings: list[dict] = []
+        self.recommendations: list[dict] = []
+        self.comments_with_id: list[dict] = []
+        self.comments: list[dict] = []
+        self.usernames: dict[str, str] = {}
+
+    def __len__(self):
+        return (
+            len(self.user_settings)
+            + len(self.recommendations)
+            + len(self.comments_with_id)
+            + len(self.comments)
+            + (self.global_limit is not None)
+        )
+
+    def add(self, record: dict) -> str:
+        kind = record.get("type")
+        if kind == "settings":
+            self.global_limit = int(record.get("globalLimit") or 0)
+        elif kind == "userSetting":
+            self.user_settings.append(
+                {
+                    "user_id": _required(record, "userId"),
+                    "user_limit": int(record.get("userLimit") or 0),
+                }
+            )
+        elif kind == "recommendation":
+            user_id = _required(record, "userId")
+            self._add_username(user_id, record.get("username"))
+            self.recommendations.append(
+                {
+                    "user_id": user_id,
+                    "item_id": _required(record, "itemId"),
+                    "created_at": _parse_datetime(record.get("createdAt")),
+                }
+            )
+        elif kind == "comment":
+            user_id = _required(record, "userId")
+            self._add_username(user_id, record.get("username"))
+            row = {
+                "user_id": user_id,
+                "item_id": _required(record, "itemId"),
+                "comment": record.get("comment"),
+            }
+            if self.keep_ids and record.get("id") is not None:
+                self.comments_with_id.append({"id": int(record["id"]), **row})
+            else:
+                self.comments.append(row)
+        else:
+            raise ValueError(f"Unknown record type: {kind!r}")
+        return kind
+
+    def _add_username(self, user_id: str, username: str | None) -> None:
+        # Exports carry the provisional name for users without one.
+        if username and username != fallback_username(user_id):
+            self.usernames[user_id] = username
+
+    def write(self, conn: Connection) -> None:
+        # Names go in first, so new users' rows are indexed with them.
+        if self.usernames:
+            conn.execute(
+                sqlite_insert(User).on_conflict_do_nothing(
+                    index_elements=[User.user_id]
+                ),
+                [
+                    {"user_id": user_id, "name": name}
+                    for user_id, name in self.usernames.items()
+                ],
+            )
+        if self.global_limit is not None:
+            updated = conn.execute(
+                update(Setting).values(global_limit=self.global_limit)
+            )
+            if not updated.rowcount:
+                conn.execute(
+                    Setting.__table__.insert(),
+                    {"global_limit": self.global_limit},
+                )
+        if self.user_settings:
+            stmt = sqlite_insert(UserSetting)
+            conn.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[UserSetting.user_id],
+                    set_={"user_limit": stmt.excluded.user_limit},
+                ),
+                self.user_settings,
+            )
+        if self.recommendations:
+            stmt = sqlite_insert(Recommendation)
+            conn.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[
+                        Recommendation.user_id,
+                        Recommendation.item_id,
+                    ],
+                    set_={"created_at": stmt.excluded.created_at},
+                ),
+                self.recommendations,
+            )
+        if self.comments_with_id:
+            stmt = sqlite_insert(Comment)
+            conn.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[Comment.id],
+                    set_={
+                        "user_id": stmt.excluded.user_id,
+                        "item_id": stmt.excluded.item_id,
+                        "comment": stmt.excluded.comment,
+                    },
+                ),
+                self.comments_with_id,
+            )
+        if self.comments:
+            conn.execute(_INSERT_NEW_COMMENT, self.comments)
+
+
+def _insert_new_comment():
+    # INSERT ... SELECT ... WHERE NOT EXISTS: keyed on content, not on id.
+    values = {
+        name: bindparam(name, type_=Comment.__table__.c[name].type)
+        for name in ("user_id", "item_id", "comment")
+    }
+    duplicate = exists().where(
+        *(Comment.__table__.c[name] == value for name, value in values.items())
+    )
+    return insert(Comment).from_select(
+        list(values), select(*values.values()).where(~duplicate)
+    )
+
+
+_INSERT_NEW_COMMENT = _insert_new_comment()
+
+
+def _required(record: dict, key: str) -> str:
+    value = record.get(key)
+    if not value:
+        raise ValueError(f"Missing {key}")
+    return str(value)
+
+
+def import_ndjson(
+    lines: Iterable[str | bytes],
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    progress: Progress | None = None,
+    keep_ids: bool = False,
+) -> Counter:
+    """
+    Upsert NDJSON records in transactions of `chunk_size` rows, each written
+    with one `executemany` per statement. Returns the counts per record
+    type; `progress` is called with the running counts after every chunk.
+    `keep_ids` upserts comments on their id, for a database's own export.
+
+    Raises ValueError (naming the line) for malformed input. Chunks before
+    the bad line stay committed, so a fixed file can simply be re-imported.
+    """
+    counts: Counter = Counter()
+    batch = _Batch(keep_ids)
+
+    def flush() -> None:
+        nonlocal batch
+        if not len(batch):
+            return
+        with ENGINE.begin() as conn:
+            batch.write(conn)
+        batch = _Batch(keep_ids)
+        if progress is not None:
+            progress(counts)
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            counts[batch.add(json.loads(line))] += 1
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"line {number}: {e}") from e
+        if len(batch) >= chunk_size:
+            flush()
+    flush()
+    return counts
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export")
+    export_parser.add_argument("file", nargs="?", default="-")
+    export_parser.add_argument("--tables", help=", ".join(TABLES))
+    import_parser = commands.add_parser("import")
+    import_parser.add_argument("file", nargs="?", default="-")
+    import_parser.add_argument(
+        "--chunk-size", type=int, default=IMPORT_CHUNK_SIZE
+    )
+    import_parser.add_argument(
+        "--keep-ids",
+        action="store_true",
+        help="upsert comments on id (restoring this database's own export)",
+    )
+    args = parser.parse_args()
+
+    init_db()
+    started = time.perf_counter()
+    if args.command == "export":
+        tables = parse_tables(args.tables)
+        # Standard streams are left open.
+        out = (
+            contextlib.nullcontext(sys.stdout)
+            if args.file == "-"
+            else open(args.file, "w", encoding="utf-8")
+        )
+        with out as stream:
+            stream.writelines(export_ndjson(tables))
+        logger.info(
+            "Exported %s in %.1fs",
+            ", ".join(tables),
+            time.perf_counter() - started,
+        )
+        return 0
+
+    def report(counts: Counter) -> None:
+        logger.info(
+            "Imported %s rows so far (%.1fs)",
+            sum(counts.values()),
+            time.perf_counter() - started,
+        )
+
+    source = (
+        contextlib.nullcontext(sys.stdin)
+        if args.file == "-"
+        else open(args.file, encoding="utf-8")
+    )
+    with source as stream:
+        counts = import_ndjson(
+            stream, args.chunk_size, progress=report, keep_ids=args.keep_ids
+        )
+    logger.info(
+        "Import finished in %.1fs: %s",
+        time.perf_counter() - started,
+        dict(counts),
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,394 @@
 import os
+from collections.abc import Callable
 
-from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy import (
+    Connection,
+    Result,
+    Select,
+    create_engine,
+    delete,
+    event,
+    func,
+    insert,
+    inspect,
+    literal,
+    select,
+    text,
+    union_all,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import scoped_session, sessionmaker
 
 from backend.logger import logger
-from backend.models import Base, Setting
-from backend.settings import settings
+from backend.models import (
+    GLOBAL_COUNTER_KEY,
+    Base,
+    ChangeLog,
+    ChangeLogHorizon,
+    Comment,
+    DatabaseOption,
+    ItemVersion,
+    JellyfinId,
+    Recommendation,
+    RecommendationCounter,
+    Setting,
+    SettingsVersion,
+    User,
+    pack_id,
+    unpack_id,
+)
+from backend.settings import Settings, settings
+
+# `init_db` converts the stored ids to match before the app serves.
+JellyfinId.compact = settings.compact_ids
+ID_STORAGE_OPTION = "id_storage"
 
 DB_URL = f"sqlite+pysqlite:///{settings.db_path}"
-ENGINE = create_engine(DB_URL, future=True)
+ENGINE = create_engine(
+    DB_URL,
+    future=True,
+    # Connections are per-process (see the fork hook below) and reused, so
+    # each keeps its page cache and mmap warm across requests.
+    pool_size=settings.sqlite_pool_size,
+    max_overflow=settings.sqlite_pool_max_overflow,
+)
 db_session = scoped_session(
     sessionmaker(bind=ENGINE, autocommit=False, autoflush=False)
 )
 
 
+def read_rows(stmt: Select) -> Result:
+    """
+    Run a column select on the session's connection, as plain Core rows.
+
+    `db_session.execute` puts even column-only results through the ORM's
+    loading machinery, which on long lists costs more than the query.
+    """
+    return db_session.connection().execute(stmt)
+
+
+def sqlite_pragmas(config: Settings = settings) -> list[str]:
+    """
+    PRAGMA statements making up the configured SQLite engine profile.
+    """
+    pragmas = {
+        "journal_mode": config.sqlite_journal_mode,
+        "synchronous": config.sqlite_synchronous,
+        "busy_timeout": config.sqlite_busy_timeout_ms,
+        # Negative cache_size is in KiB rather than pages.
+        "cache_size": -config.sqlite_cache_size_kib,
+        "mmap_size": config.sqlite_mmap_size,
+    }
+    return [f"PRAGMA {name} = {value}" for name, value in pragmas.items()]
+
+
+@event.listens_for(ENGINE, "connect")
+def _apply_sqlite_pragmas(dbapi_connection, _connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in sqlite_pragmas():
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+# Never share pooled SQLite connections with a forked child (e.g. gunicorn
+# with --preload); the child opens its own on first use.
+os.register_at_fork(after_in_child=lambda: ENGINE.dispose(close=False))
+
+
+# '' is GLOBAL_COUNTER_KEY, the row holding the total across all users.
+RECOMMENDATION_COUNTER_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS recommendations_count_insert
+    AFTER INSERT ON recommendations
+    BEGIN
+        INSERT INTO recommendation_counters (user_id, total)
+        VALUES ('', 1), (NEW.user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET total = total + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recommendations_count_delete
+    AFTER DELETE ON recommendations
+    BEGIN
+        UPDATE recommendation_counters
+        SET total = total - 1
+        WHERE user_id IN ('', OLD.user_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recommendations_count_update
+    AFTER UPDATE OF user_id ON recommendations
+    WHEN NEW.user_id IS NOT OLD.user_id
+    BEGIN
+        UPDATE recommendation_counters
+        SET total = total - 1
+        WHERE user_id = OLD.user_id;
+        INSERT INTO recommendation_counters (user_id, total)
+        VALUES (NEW.user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET total = total + 1;
+    END
+    """,
+]
+
+
+def _item_version_triggers(table: str) -> list[str]:
+    def bump(ref: str, condition: str = "") -> str:
+        return f"""
+        INSERT INTO item_versions (item_id, version)
+        SELECT {ref}.item_id, 1
+        WHERE {ref}.item_id IS NOT NULL {condition}
+        ON CONFLICT (item_id) DO UPDATE SET version = version + 1;
+        """
+
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_version_insert
+        AFTER INSERT ON {table}
+        BEGIN {bump("NEW")} END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_version_delete
+        AFTER DELETE ON {table}
+        BEGIN {bump("OLD")} END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_version_update
+        AFTER UPDATE ON {table}
+        BEGIN
+            {bump("OLD")}
+            {bump("NEW", "AND NEW.item_id IS NOT OLD.item_id")}
+        END
+        """,
+    ]
+
+
+ITEM_VERSION_TRIGGERS = [
+    *_item_version_triggers("recommendations"),
+    *_item_version_triggers("comments"),
+]
+
+
+def _settings_version_triggers(table: str) -> list[str]:
+    bump = """
+        INSERT INTO settings_version (id, version) VALUES (1, 1)
+        ON CONFLICT (id) DO UPDATE SET version = version + 1;
+    """
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_version_{operation}
+        AFTER {operation.upper()} ON {table}
+        BEGIN {bump} END
+        """
+        for operation in ("insert", "update", "delete")
+    ]
+
+
+SETTINGS_VERSION_TRIGGERS = [
+    *_settings_version_triggers("settings"),
+    *_settings_version_triggers("user_settings"),
+]
+
+
+def _change_log_triggers(table: str, kind: str) -> list[str]:
+    def log(ref: str, op: str, where: str = "") -> str:
+        comment_id = f"{ref}.id" if kind == "comment" else "NULL"
+        return f"""
+        INSERT INTO change_log (kind, op, user_id, item_id, comment_id)
+        SELECT '{kind}', '{op}', {ref}.user_id, {ref}.item_id, {comment_id}
+        {where};
+        """
+
+    moved = """
+        WHERE NEW.user_id IS NOT OLD.user_id
+        OR NEW.item_id IS NOT OLD.item_id
+    """
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_change_log_insert
+        AFTER INSERT ON {table}
+        BEGIN {log("NEW", "upsert")} END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_change_log_delete
+        AFTER DELETE ON {table}
+        BEGIN {log("OLD", "delete")} END
+        """,
+        # A row moved to another user or item leaves a tombstone behind.
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_change_log_update
+        AFTER UPDATE ON {table}
+        BEGIN
+            {log("OLD", "delete", moved)}
+            {log("NEW", "upsert")}
+        END
+        """,
+    ]
+
+
+CHANGE_LOG_TRIGGERS = [
+    *_change_log_triggers("recommendations", "recommendation"),
+    *_change_log_triggers("comments", "comment"),
+]
+
+
+# SQL twin of `id_text`: an id column as hex text, TEXT or BLOB.
+def _id_text(ref: str) -> str:
+    return (
+        f"CASE typeof({ref}) WHEN 'blob' THEN lower(hex({ref})) "
+        f"ELSE {ref} END"
+    )
+
+
+# The name indexed for a comment's user, NULL until `users` has a row. The
+# triggers on `users` below reindex a user's comments when it changes.
+def _username_of(ref: str) -> str:
+    return f"(SELECT name FROM users WHERE user_id = {ref}.user_id)"
+
+
+# External-content FTS5 index over comments: it stores only the index,
+# the text itself is read back by rowid (= comments.id) through a view that
+# presents item ids as hex text, so item-scoped queries work with either id
+# storage. `item_id` is indexed to scope searches within the index.
+COMMENT_SEARCH_TABLES = [
+    f"""
+    CREATE VIEW IF NOT EXISTS comments_fts_content AS
+    SELECT
+        comments.id,
+        comments.comment,
+        users.name AS username,
+        {_id_text("comments.item_id")} AS item_id
+    FROM comments
+    LEFT JOIN users ON users.user_id = comments.user_id
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5(
+        comment,
+        username,
+        item_id,
+        content='comments_fts_content',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+]
+
+# Removing a row from an external-content index needs its old values.
+_COMMENT_SEARCH_DELETE = f"""
+    INSERT INTO comments_fts
+        (comments_fts, rowid, comment, username, item_id)
+    VALUES (
+        'delete',
+        old.id,
+        old.comment,
+        {_username_of("old")},
+        {_id_text("old.item_id")}
+    );
+"""
+_COMMENT_SEARCH_INSERT = f"""
+    INSERT INTO comments_fts (rowid, comment, username, item_id)
+    VALUES (
+        new.id, new.comment, {_username_of("new")}, {_id_text("new.item_id")}
+    );
+"""
+
+COMMENT_SEARCH_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS comments_fts_insert
+    AFTER INSERT ON comments
+    BEGIN {_COMMENT_SEARCH_INSERT} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS comments_fts_delete
+    AFTER DELETE ON comments
+    BEGIN {_COMMENT_SEARCH_DELETE} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS comments_fts_update
+    AFTER UPDATE OF comment, user_id, item_id ON comments
+    BEGIN {_COMMENT_SEARCH_DELETE} {_COMMENT_SEARCH_INSERT} END
+    """,
+]
+
+
+def _username_change(user: str, old_name: str, new_name: str) -> str:
+    # Everything derived from a user's name besides the `users` row itself:
+    # the search index, the versions behind item ETags and cached responses,
+    # and the change feed, which re-sends the user's rows.
+    return f"""
+    INSERT INTO comments_fts
+        (comments_fts, rowid, comment, username, item_id)
+    SELECT 'delete', id, comment, {old_name}, {_id_text("item_id")}
+    FROM comments WHERE user_id = {user};
+    INSERT INTO comments_fts (rowid, comment, username, item_id)
+    SELECT id, comment, {new_name}, {_id_text("item_id")}
+    FROM comments WHERE user_id = {user};
+    INSERT INTO item_versions (item_id, version)
+    SELECT item_id, 1 FROM (
+        SELECT item_id FROM recommendations WHERE user_id = {user}
+        UNION
+        SELECT item_id FROM comments
+        WHERE user_id = {user} AND item_id IS NOT NULL
+    ) WHERE true
+    ON CONFLICT (item_id) DO UPDATE SET version = version + 1;
+    INSERT INTO change_log (kind, op, user_id, item_id, comment_id)
+    SELECT 'recommendation', 'upsert', user_id, item_id, NULL
+    FROM recommendations WHERE user_id = {user};
+    INSERT INTO change_log (kind, op, user_id, item_id, comment_id)
+    SELECT 'comment', 'upsert', user_id, item_id, id
+    FROM comments WHERE user_id = {user};
+    """
+
+
+USERNAME_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS users_name_insert
+    AFTER INSERT ON users
+    BEGIN {_username_change("NEW.user_id", "NULL", "NEW.name")} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS users_name_delete
+    AFTER DELETE ON users
+    BEGIN {_username_change("OLD.user_id", "OLD.name", "NULL")} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS users_name_update
+    AFTER UPDATE OF name ON users
+    WHEN NEW.name IS NOT OLD.name
+    BEGIN {_username_change("NEW.user_id", "OLD.name", "NEW.name")} END
+    """,
+]
+
+# Every trigger in the current schema, created along with the tables.
+TRIGGERS = [
+    *RECOMMENDATION_COUNTER_TRIGGERS,
+    *ITEM_VERSION_TRIGGERS,
+    *SETTINGS_VERSION_TRIGGERS,
+    *COMMENT_SEARCH_TRIGGERS,
+    *CHANGE_LOG_TRIGGERS,
+    *USERNAME_TRIGGERS,
+]
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_triggers(_target, conn, **_kw):
+    # The FTS table isn't a model, so it is created here with its triggers.
+    _execute_all(conn, [*COMMENT_SEARCH_TABLES, *TRIGGERS])
+
+
+def _execute_all(conn: Connection, statements: list[str]) -> None:
+    for statement in statements:
+        conn.exec_driver_sql(statement)
+
+
 def init_db():
     logger.debug("Initializing database at %s", settings.db_path)
     try:
         os.makedirs(os.path.dirname(settings.db_path), exist_ok=True)
-        _migrate_legacy_tables()
+        _run_migrations()
         Base.metadata.create_all(ENGINE)
+        _apply_id_storage()
         _ensure_global_settings_row()
         logger.info(
             "Database initialized successfully at %s", settings.db_path
@@ -36,14 +405,136 @@ def _ensure_global_settings_row() -> None:
         db_session.commit()
 
 
-def _migrate_legacy_tables() -> None:
-    _migrate_legacy_recommendations_table()
-    _migrate_legacy_comments_table()
-    _migrate_legacy_settings_tables()
+def _apply_id_storage() -> None:
+    wanted = "blob" if settings.compact_ids else "text"
+    with ENGINE.begin() as conn:
+        current = conn.scalar(
+            select(DatabaseOption.value).where(
+                DatabaseOption.name == ID_STORAGE_OPTION
+            )
+        )
+        if (current or "text") == wanted:
+            return
+        logger.info(
+            "Converting stored ids from %s to %s", current or "text", wanted
+        )
+        convert_id_storage(conn, compact=wanted == "blob")
+    # Reclaim the space freed by the conversion.
+    _vacuum()
+
+
+def _vacuum() -> None:
+    with ENGINE.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql(
+            "VACUUM"
+        )
+
+
+def convert_id_storage(conn: Connection, compact: bool) -> None:
+    """
+    Rewrite every `JellyfinId` column in place: Jellyfin ids become 16-byte
+    BLOBs (`compact`) or hex TEXT again, and the storage is recorded in
+    `database_options`.
+
+    Triggers are dropped for the rewrite, since nothing really changed:
+    counters, item versions, the change log and the search index (which
+    reads item ids as text) all stay valid.
+    """
+    conn.connection.driver_connection.create_function(
+        "convert_id", 1, pack_id if compact else unpack_id, deterministic=True
+    )
+    triggers = conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+    ).scalars()
+    for name in list(triggers):
+        conn.exec_driver_sql(f'DROP TRIGGER "{name}"')
+    stored = "text" if compact else "blob"
+    for table in Base.metadata.sorted_tables:
+        for column in table.columns:
+            if isinstance(column.type, JellyfinId):
+                conn.exec_driver_sql(
+                    f"UPDATE {table.name} "
+                    f"SET {column.name} = convert_id({column.name}) "
+                    f"WHERE typeof({column.name}) = '{stored}'"
+                )
+    _execute_all(conn, TRIGGERS)
+    stmt = sqlite_insert(DatabaseOption).values(
+        name=ID_STORAGE_OPTION, value="blob" if compact else "text"
+    )
+    conn.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[DatabaseOption.name],
+            set_={"value": stmt.excluded.value},
+        )
+    )
+
+
+def rebuild_recommendation_counters(conn: Connection | None = None) -> None:
+    """
+    Recompute `recommendation_counters` from scratch, e.g. after the table
+    was edited with triggers disabled.
+    """
+    if conn is None:
+        with ENGINE.begin() as connection:
+            rebuild_recommendation_counters(connection)
+        return
+
+    logger.info("Rebuilding recommendation counters")
+    per_user = select(
+        Recommendation.user_id, func.count().label("total")
+    ).group_by(Recommendation.user_id)
+    overall = select(
+        literal(GLOBAL_COUNTER_KEY).label("user_id"),
+        func.count().label("total"),
+    ).select_from(Recommendation)
+    conn.execute(delete(RecommendationCounter))
+    conn.execute(
+        insert(RecommendationCounter).from_select(
+            ["user_id", "total"], union_all(overall, per_user)
+        )
+    )
+
+
+def _run_migrations() -> None:
+    """
+    Apply pending entries of `MIGRATIONS`, tracked via `PRAGMA user_version`.
+
+    Migration N (1-based) is applied when the stored version is below N, in
+    its own transaction that also records the new version. A brand-new
+    database is created from the models and stamped with the latest version.
+    """
+    latest = len(MIGRATIONS)
+    with ENGINE.begin() as conn:
+        version = conn.exec_driver_sql("PRAGMA user_version").scalar() or 0
+        if version == 0 and not inspect(conn).get_table_names():
+            logger.info("Creating new database at schema version %s", latest)
+            Base.metadata.create_all(conn)
+            _set_schema_version(conn, latest)
+            return
+
+    vacuum = False
+    for number, migration in enumerate(MIGRATIONS, start=1):
+        if number <= version:
+            continue
+        logger.info(
+            "Applying schema migration %s: %s", number, migration.__name__
+        )
+        with ENGINE.begin() as conn:
+            migration(conn)
+            _set_schema_version(conn, number)
+        vacuum = vacuum or migration in VACUUM_AFTER
+    if vacuum:
+        logger.info("Reclaiming space freed by the migrations")
+        _vacuum()
+
 
+def _set_schema_version(conn: Connection, version: int) -> None:
+    # PRAGMA arguments can't be bound parameters.
+    conn.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
 
-def _migrate_legacy_recommendations_table() -> None:
-    inspector = inspect(ENGINE)
+
+def _migrate_legacy_recommendations_table(conn: Connection) -> None:
+    inspector = inspect(conn)
 
     # If table doesn't exist, skip
     if "recommendations" not in inspector.get_table_names():
@@ -64,36 +555,35 @@ def _migrate_legacy_recommendations_table() -> None:
         )
 
     logger.info("Migrating recommendations table to snake_case columns")
-    with ENGINE.begin() as conn:
-        conn.execute(
-            text(
-                """
-                CREATE TABLE recommendations_new (
-                    user_id TEXT,
-                    item_id TEXT,
-                    username TEXT,
-                    PRIMARY KEY (user_id, item_id)
-                )
-                """
+    conn.execute(
+        text(
+            """
+            CREATE TABLE recommendations_new (
+                user_id TEXT,
+                item_id TEXT,
+                username TEXT,
+                PRIMARY KEY (user_id, item_id)
             )
+            """
         )
-        conn.execute(
-            text(
-                """
-                INSERT INTO recommendations_new (user_id, item_id, username)
-                SELECT userId, itemId, username
-                FROM recommendations
-                """
-            )
-        )
-        conn.execute(text("DROP TABLE recommendations"))
-        conn.execute(
-            text("ALTER TABLE recommendations_new RENAME TO recommendations")
+    )
+    conn.execute(
+        text(
+            """
+            INSERT INTO recommendations_new (user_id, item_id, username)
+            SELECT userId, itemId, username
+            FROM recommendations
+            """
         )
+    )
+    conn.execute(text("DROP TABLE recommendations"))
+    conn.execute(
+        text("ALTER TABLE recommendations_new RENAME TO recommendations")
+    )
 
 
-def _migrate_legacy_comments_table() -> None:
-    inspector = inspect(ENGINE)
+def _migrate_legacy_comments_table(conn: Connection) -> None:
+    inspector = inspect(conn)
 
     # If table doesn't exist, skip
     if "comments" not in inspector.get_table_names():
@@ -114,35 +604,34 @@ def _migrate_legacy_comments_table() -> None:
         )
 
     logger.info("Migrating comments table to snake_case columns")
-    with ENGINE.begin() as conn:
-        conn.execute(
-            text(
-                """
-                CREATE TABLE comments_new (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT,
-                    item_id TEXT,
-                    username TEXT,
-                    comment TEXT
-                )
-                """
+    conn.execute(
+        text(
+            """
+            CREATE TABLE comments_new (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT,
+                item_id TEXT,
+                username TEXT,
+                comment TEXT
             )
+            """
         )
-        conn.execute(
-            text(
-                """
-                INSERT INTO comments_new (id, user_id, item_id, username, comment)
-                SELECT id, userId, itemId, username, comment
-                FROM comments
-                """
-            )
+    )
+    conn.execute(
+        text(
+            """
+            INSERT INTO comments_new (id, user_id, item_id, username, comment)
+            SELECT id, userId, itemId, username, comment
+            FROM comments
+            """
         )
-        conn.execute(text("DROP TABLE comments"))
-        conn.execute(text("ALTER TABLE comments_new RENAME TO comments"))
+    )
+    conn.execute(text("DROP TABLE comments"))
+    conn.execute(text("ALTER TABLE comments_new RENAME TO comments"))
 
 
-def _migrate_legacy_settings_tables() -> None:
-    inspector = inspect(ENGINE)
+def _migrate_legacy_settings_tables(conn: Connection) -> None:
+    inspector = inspect(conn)
 
     # If table doesn't exist, skip
     if "settings" not in inspector.get_table_names():
@@ -163,47 +652,265 @@ def _migrate_legacy_settings_tables() -> None:
         )
 
     logger.info("Migrating settings table to split global/user settings")
-    with ENGINE.begin() as conn:
-        conn.execute(
-            text(
-                """
-                CREATE TABLE settings_new (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    global_limit INTEGER
-                )
-                """
+    conn.execute(
+        text(
+            """
+            CREATE TABLE settings_new (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                global_limit INTEGER
             )
+            """
         )
-        conn.execute(
-            text(
-                """
-                CREATE TABLE user_settings (
-                    user_id TEXT PRIMARY KEY,
-                    user_limit INTEGER
-                )
-                """
+    )
+    conn.execute(
+        text(
+            """
+            CREATE TABLE user_settings (
+                user_id TEXT PRIMARY KEY,
+                user_limit INTEGER
             )
+            """
         )
-        conn.execute(
-            text(
-                """
-                INSERT INTO settings_new (global_limit)
-                SELECT globalLimit
-                FROM settings
-                WHERE userId IS NULL
-                LIMIT 1
-                """
-            )
+    )
+    conn.execute(
+        text(
+            """
+            INSERT INTO settings_new (global_limit)
+            SELECT globalLimit
+            FROM settings
+            WHERE userId IS NULL
+            LIMIT 1
+            """
+        )
+    )
+    conn.execute(
+        text(
+            """
+            INSERT INTO user_settings (user_id, user_limit)
+            SELECT userId, perUserLimit
+            FROM settings
+            WHERE userId IS NOT NULL
+            """
         )
+    )
+    conn.execute(text("DROP TABLE settings"))
+    conn.execute(text("ALTER TABLE settings_new RENAME TO settings"))
+
+
+def _add_item_id_indexes(conn: Connection) -> None:
+    tables = set(inspect(conn).get_table_names())
+    for index in (
+        *Recommendation.__table__.indexes,
+        *Comment.__table__.indexes,
+    ):
+        if index.table.name in tables:
+            index.create(conn, checkfirst=True)
+
+
+def _add_recommendation_counters(conn: Connection) -> None:
+    RecommendationCounter.__table__.create(conn, checkfirst=True)
+    if "recommendations" in inspect(conn).get_table_names():
+        _execute_all(conn, RECOMMENDATION_COUNTER_TRIGGERS)
+        rebuild_recommendation_counters(conn)
+
+
+def _add_recommendation_created_at(conn: Connection) -> None:
+    inspector = inspect(conn)
+    if "recommendations" not in inspector.get_table_names():
+        return
+    columns = {col["name"] for col in inspector.get_columns("recommendations")}
+    if "created_at" not in columns:
         conn.execute(
-            text(
-                """
-                INSERT INTO user_settings (user_id, user_limit)
-                SELECT userId, perUserLimit
-                FROM settings
-                WHERE userId IS NOT NULL
-                """
-            )
+            text("ALTER TABLE recommendations ADD COLUMN created_at DATETIME")
+        )
+
+
+def _add_item_versions(conn: Connection) -> None:
+    ItemVersion.__table__.create(conn, checkfirst=True)
+    tables = set(inspect(conn).get_table_names())
+    if {"recommendations", "comments"} <= tables:
+        _execute_all(conn, ITEM_VERSION_TRIGGERS)
+
+
+def _add_settings_version(conn: Connection) -> None:
+    SettingsVersion.__table__.create(conn, checkfirst=True)
+    tables = set(inspect(conn).get_table_names())
+    if {"settings", "user_settings"} <= tables:
+        _execute_all(conn, SETTINGS_VERSION_TRIGGERS)
+
+
+def rebuild_comment_search(conn: Connection | None = None) -> None:
+    """
+    Reindex `comments_fts` from the `comments` table, e.g. after comments
+    were edited with triggers disabled.
+    """
+    if conn is None:
+        with ENGINE.begin() as connection:
+            rebuild_comment_search(connection)
+        return
+
+    logger.info("Rebuilding comment search index")
+    conn.exec_driver_sql(
+        "INSERT INTO comments_fts (comments_fts) VALUES ('rebuild')"
+    )
+
+
+def _comment_search_before_users(view: bool) -> list[str]:
+    # The search index as migrations 9 (`view=False`) and 11 (`view=True`)
+    # created it, while comments still carried a `username` column. Frozen
+    # here: those migrations must keep doing what they shipped doing.
+    item_id = _id_text if view else (lambda ref: ref)
+    delete_sql = f"""
+        INSERT INTO comments_fts
+            (comments_fts, rowid, comment, username, item_id)
+        VALUES (
+            'delete', old.id, old.comment, old.username,
+            {item_id("old.item_id")}
+        );
+    """
+    insert_sql = f"""
+        INSERT INTO comments_fts (rowid, comment, username, item_id)
+        VALUES (new.id, new.comment, new.username, {item_id("new.item_id")});
+    """
+    content = "comments_fts_content" if view else "comments"
+    statements = [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5(
+            comment,
+            username,
+            item_id,
+            content='{content}',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS comments_fts_insert
+        AFTER INSERT ON comments
+        BEGIN {insert_sql} END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS comments_fts_delete
+        AFTER DELETE ON comments
+        BEGIN {delete_sql} END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS comments_fts_update
+        AFTER UPDATE OF comment, username, item_id ON comments
+        BEGIN {delete_sql} {insert_sql} END
+        """,
+    ]
+    if view:
+        statements.insert(
+            0,
+            f"""
+            CREATE VIEW IF NOT EXISTS comments_fts_content AS
+            SELECT id, comment, username, {_id_text("item_id")} AS item_id
+            FROM comments
+            """,
+        )
+    return statements
+
+
+def _add_comment_search(conn: Connection) -> None:
+    if "comments" not in inspect(conn).get_table_names():
+        return
+    _execute_all(conn, _comment_search_before_users(view=False))
+    rebuild_comment_search(conn)
+
+
+def _create_comment_search(conn: Connection) -> None:
+    # The current index, reading usernames from `users`.
+    _execute_all(conn, [*COMMENT_SEARCH_TABLES, *COMMENT_SEARCH_TRIGGERS])
+    rebuild_comment_search(conn)
+
+
+def _add_change_log(conn: Connection) -> None:
+    ChangeLog.__table__.create(conn, checkfirst=True)
+    ChangeLogHorizon.__table__.create(conn, checkfirst=True)
+    tables = set(inspect(conn).get_table_names())
+    if {"recommendations", "comments"} <= tables:
+        _execute_all(conn, CHANGE_LOG_TRIGGERS)
+
+
+def _read_comment_search_through_view(conn: Connection) -> None:
+    # Recreate the index of migration 9 over `comments_fts_content`.
+    if "comments" not in inspect(conn).get_table_names():
+        return
+    existing = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE name = 'comments_fts'"
+    ).scalar()
+    if existing and "comments_fts_content" in existing:
+        return
+    for operation in ("insert", "delete", "update"):
+        conn.exec_driver_sql(
+            f"DROP TRIGGER IF EXISTS comments_fts_{operation}"
         )
-        conn.execute(text("DROP TABLE settings"))
-        conn.execute(text("ALTER TABLE settings_new RENAME TO settings"))
+    conn.exec_driver_sql("DROP TABLE IF EXISTS comments_fts")
+    _execute_all(conn, _comment_search_before_users(view=True))
+    rebuild_comment_search(conn)
+
+
+def _add_database_options(conn: Connection) -> None:
+    DatabaseOption.__table__.create(conn, checkfirst=True)
+
+
+def _add_users(conn: Connection) -> None:
+    # Move the username copies on every row into one `users` row per user,
+    # keeping real names only: provisional `User_xxxxxxxx` ones are now
+    # derived when read.
+    User.__table__.create(conn, checkfirst=True)
+    inspector = inspect(conn)
+    tables = set(inspector.get_table_names())
+    # The search index reads the column being dropped; rebuilt below.
+    for operation in ("insert", "delete", "update"):
+        conn.exec_driver_sql(
+            f"DROP TRIGGER IF EXISTS comments_fts_{operation}"
+        )
+    conn.exec_driver_sql("DROP TABLE IF EXISTS comments_fts")
+    conn.exec_driver_sql("DROP VIEW IF EXISTS comments_fts_content")
+    for table in ("recommendations", "comments"):
+        if table not in tables:
+            continue
+        columns = {col["name"] for col in inspector.get_columns(table)}
+        if "username" not in columns:
+            continue
+        conn.exec_driver_sql(
+            f"""
+            INSERT INTO users (user_id, name)
+            SELECT user_id, max(username) FROM {table}
+            WHERE user_id IS NOT NULL
+            AND username IS NOT NULL
+            AND username != 'User_' || substr({_id_text("user_id")}, 1, 8)
+            GROUP BY user_id
+            ON CONFLICT (user_id) DO NOTHING
+            """
+        )
+        conn.exec_driver_sql(f"ALTER TABLE {table} DROP COLUMN username")
+    if "comments" in tables:
+        for index in Comment.__table__.indexes:
+            index.create(conn, checkfirst=True)
+        _create_comment_search(conn)
+    if {"recommendations", "comments"} <= tables:
+        _execute_all(conn, USERNAME_TRIGGERS)
+
+
+# Append-only: never reorder or remove entries, the position of each
+# migration is its schema version.
+MIGRATIONS: list[Callable[[Connection], None]] = [
+    _migrate_legacy_recommendations_table,
+    _migrate_legacy_comments_table,
+    _migrate_legacy_settings_tables,
+    _add_item_id_indexes,
+    _add_recommendation_counters,
+    _add_recommendation_created_at,
+    _add_item_versions,
+    _add_settings_version,
+    _add_comment_search,
+    _add_change_log,
+    _read_comment_search_through_view,
+    _add_database_options,
+    _add_users,
+]
+# Migrations that free enough space to vacuum the database afterwards.
+VACUUM_AFTER = {_add_users}
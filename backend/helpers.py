@@ -1,30 +1,302 @@
+import base64
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
 import requests
+from requests.adapters import HTTPAdapter
 
 from backend.logger import logger
 from backend.settings import settings
+from backend.util.metrics import observe_jellyfin
 
 
-def get_jellyfin_username(user_id):
-    logger.debug("Fetching username for user_id: %s", user_id)
+def fallback_username(user_id: str) -> str:
+    return f"User_{user_id[:8]}"
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Opaque, URL-safe pagination cursor for a keyset position.
+    """
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list[Any]:
+    """
+    Inverse of `encode_cursor`. Raises ValueError for malformed cursors.
+    """
     try:
-        url = f"{settings.jellyfin_url}/Users/{user_id}?api_key={settings.jellyfin_api_key}"
-        response = requests.get(url)
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def parse_limit(value: str | None, default: int, maximum: int) -> int:
+    """
+    Parse a `limit` query parameter, clamped to `1..maximum`.
+    """
+    if value is None:
+        return default
+    return max(1, min(int(value), maximum))
+
+
+class TTLCache:
+    """
+    Thread-safe, bounded LRU cache whose entries expire after a per-entry TTL.
+
+    Hit, miss, expiry and eviction counters are kept so the cache can be
+    sized from production traffic (see `stats`).
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def get(self, key: Any) -> tuple[bool, Any]:
+        """
+        Return `(found, value)`. Expired entries count as misses.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key: Any, value: Any, ttl: float | None = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "hitRatio": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+def _build_jellyfin_session() -> requests.Session:
+    """
+    Shared keep-alive session so Jellyfin calls reuse pooled connections
+    instead of paying a TCP/TLS handshake per request.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=settings.jellyfin_pool_size,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.params = {"api_key": settings.jellyfin_api_key}
+    return session
+
+
+JELLYFIN_SESSION = _build_jellyfin_session()
+
+
+def jellyfin_get(path: str, **kwargs: Any) -> requests.Response:
+    kwargs.setdefault("timeout", settings.jellyfin_timeout)
+    started = time.perf_counter()
+    status = "error"
+    try:
+        response = JELLYFIN_SESSION.get(
+            f"{settings.jellyfin_url}{path}", **kwargs
+        )
+        status = str(response.status_code)
+        return response
+    finally:
+        observe_jellyfin(path, status, time.perf_counter() - started)
+
+
+def fetch_jellyfin_items(item_ids: list[str]) -> list[dict] | None:
+    """
+    Fetch `Name`, `Overview` and `ImageTags` for many items with one
+    `/Items?Ids=...` call. Returns None if Jellyfin could not be queried.
+    """
+    logger.debug("Fetching %s items from Jellyfin", len(item_ids))
+    try:
+        response = jellyfin_get(
+            "/Items",
+            params={"Ids": ",".join(item_ids), "Fields": "Overview"},
+        )
         if response.ok:
-            user_data = response.json()
-            username = user_data.get("Name", f"User_{user_id[:8]}")
-            logger.info(
-                "Fetched username for user_id=%s: %s", user_id, username
-            )
+            return response.json().get("Items", [])
+        logger.warning(
+            "Failed to fetch %s items: HTTP %s",
+            len(item_ids),
+            response.status_code,
+        )
+    except Exception as e:
+        logger.error("Error fetching %s items: %s", len(item_ids), str(e))
+    return None
+
+
+class UsernameResolver:
+    """
+    Resolves Jellyfin user ids to display names.
+
+    Names are cached process-wide. Failed lookups cache the `User_xxxxxxxx`
+    fallback for a shorter TTL so an unreachable Jellyfin is not hammered on
+    every write.
+    """
+
+    def __init__(self, cache: TTLCache, negative_ttl: float):
+        self.cache = cache
+        self.negative_ttl = negative_ttl
+
+    def resolve(self, user_id: str) -> str:
+        found, username = self.cache.get(user_id)
+        if found:
             return username
-        else:
+
+        username = self._fetch(user_id)
+        if username is None:
+            self.cache.set(
+                user_id, fallback_username(user_id), self.negative_ttl
+            )
+            return fallback_username(user_id)
+
+        self.cache.set(user_id, username)
+        return username
+
+    def peek(self, user_id: str) -> str | None:
+        """
+        Return the cached username without ever calling Jellyfin.
+        """
+        found, username = self.cache.get(user_id)
+        return username if found else None
+
+    def warm(self) -> int:
+        """
+        Populate the cache from Jellyfin's full `/Users` list in one call.
+
+        Returns the number of cached users.
+        """
+        logger.debug("Warming username cache from Jellyfin /Users")
+        users = self.fetch_all()
+        if users is None:
+            return 0
+        logger.info("Username cache warmed with %s users", len(users))
+        return len(users)
+
+    def fetch_all(self) -> dict[str, str] | None:
+        """
+        Every Jellyfin user's name by id, from `/Users` in one call, also
+        cached. None when Jellyfin can't be reached.
+        """
+        try:
+            response = jellyfin_get("/Users")
+            if not response.ok:
+                logger.warning(
+                    "Failed to fetch Jellyfin users: HTTP %s",
+                    response.status_code,
+                )
+                return None
+            users = response.json()
+        except Exception as e:
+            logger.error("Error fetching Jellyfin users: %s", str(e))
+            return None
+
+        names = {}
+        for user in users:
+            user_id, username = user.get("Id"), user.get("Name")
+            if user_id and username:
+                self.cache.set(user_id, username)
+                names[user_id] = username
+        return names
+
+    def _fetch(self, user_id: str) -> str | None:
+        logger.debug("Fetching username for user_id: %s", user_id)
+        try:
+            response = jellyfin_get(f"/Users/{user_id}")
+            if response.ok:
+                user_data = response.json()
+                username = user_data.get("Name") or fallback_username(user_id)
+                logger.info(
+                    "Fetched username for user_id=%s: %s", user_id, username
+                )
+                return username
             logger.warning(
                 "Failed to fetch username for user_id=%s: HTTP %s",
                 user_id,
                 response.status_code,
             )
-            return f"User_{user_id[:8]}"
-    except Exception as e:
-        logger.error(
-            "Error fetching username for user_id=%s: %s", user_id, str(e)
-        )
-        return f"User_{user_id[:8]}"
+        except Exception as e:
+            logger.error(
+                "Error fetching username for user_id=%s: %s", user_id, str(e)
+            )
+        return None
+
+
+username_resolver = UsernameResolver(
+    TTLCache(
+        maxsize=settings.username_cache_size,
+        ttl=settings.username_cache_ttl,
+    ),
+    negative_ttl=settings.username_negative_cache_ttl,
+)
+
+
+def get_jellyfin_username(user_id):
+    return username_resolver.resolve(user_id)
+
+
+_warmup_pid: int | None = None
+
+
+def start_username_cache_warmup() -> None:
+    """
+    Warm the username cache in the background, once per worker process, so
+    startup is not blocked on Jellyfin.
+    """
+    global _warmup_pid  # pylint: disable=global-statement
+    if not settings.username_cache_warmup or _warmup_pid == os.getpid():
+        return
+    _warmup_pid = os.getpid()
+    threading.Thread(
+        target=username_resolver.warm,
+        name="username-cache-warmup",
+        daemon=True,
+    ).start()
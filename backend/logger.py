@@ -1,21 +1,126 @@
+import atexit
+import json
 import logging
+import os
+import queue
+import random
 import sys
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+
+from flask import g, has_request_context, request
 
 from backend.settings import settings
 
 LOG_FORMAT = "%(asctime)s %(levelname)s: %(message)s"
-LOG_FILE = "./flask-app.log"
 
 
-def _configure_logging() -> None:
-    stream_handler = logging.StreamHandler(sys.stdout)
-    file_handler = logging.FileHandler(LOG_FILE, mode="a")
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line, for log shippers. Tracebacks are already part
+    of the message by the time a record leaves the queue.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if endpoint := getattr(record, "endpoint", None):
+            entry["endpoint"] = endpoint
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class EndpointSampler(logging.Filter):
+    """
+    Keep only a fraction of the INFO records logged while serving the
+    endpoints in `rates` (Flask endpoint name -> fraction kept).
+
+    The decision is made once per request, so a sampled request keeps all of
+    its INFO lines. Other levels, and endpoints without a rate, are never
+    dropped. Also tags each record with its endpoint for `JsonFormatter`.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not has_request_context():
+            return True
+        record.endpoint = request.endpoint
+        if (
+            record.levelno != logging.INFO
+            or request.endpoint not in self.rates
+        ):
+            return True
+        if "log_sampled" not in g:
+            g.log_sampled = random.random() < self.rates[request.endpoint]
+        return g.log_sampled
+
+
+def _build_handlers() -> list[logging.Handler]:
+    # stderr, so stdout stays free for program output such as
+    # `python -m backend.bulk export` writing NDJSON.
+    handlers: list[logging.Handler] = [logging.StreamHandler(sys.stderr)]
+    if settings.log_file:
+        # Every gunicorn worker appends to the same file, so none of them
+        # may rotate it: a RotatingFileHandler per process races the others
+        # and loses records. Rotation is left to logrotate (or similar);
+        # this handler reopens the file once it has been moved away.
+        handlers.append(
+            WatchedFileHandler(settings.log_file, encoding="utf-8")
+        )
+    formatter = (
+        JsonFormatter()
+        if settings.log_format == "json"
+        else logging.Formatter(LOG_FORMAT)
+    )
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
 
-    logging.basicConfig(
-        level=settings.log_level,
-        format=LOG_FORMAT,
-        handlers=[stream_handler, file_handler],
+
+_listener: QueueListener | None = None
+
+
+def _start_listener(log_queue: queue.SimpleQueue) -> None:
+    """
+    Write queued records from a background thread, so request threads never
+    block on stdout or the log file.
+    """
+    global _listener  # pylint: disable=global-statement
+    _listener = QueueListener(
+        log_queue, *_build_handlers(), respect_handler_level=True
     )
+    _listener.start()
+
+
+def _stop_listener() -> None:
+    if _listener is not None:
+        _listener.stop()
+
+
+def _configure_logging() -> None:
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    # Only merges args into the message; the listener's handlers format it.
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    queue_handler.addFilter(EndpointSampler(settings.log_sample_rates))
+
+    logging.basicConfig(level=settings.log_level, handlers=[queue_handler])
+    _start_listener(log_queue)
+    # Flush whatever is still queued on shutdown.
+    atexit.register(_stop_listener)
+
+    def restart_in_child() -> None:
+        # The listener thread doesn't survive a fork (e.g. gunicorn
+        # --preload); give each child a fresh queue and listener.
+        queue_handler.queue = queue.SimpleQueue()
+        _start_listener(queue_handler.queue)
+
+    os.register_at_fork(after_in_child=restart_in_child)
 
 
 _configure_logging()
@@ -1,4 +1,17 @@
-from sqlalchemy import Integer, String
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import (
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    String,
+    TypeDecorator,
+    case,
+    func,
+    select,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -6,26 +19,138 @@ class Base(DeclarativeBase):
     pass
 
 
+def pack_id(value: Any) -> Any:
+    """
+    16 bytes for a Jellyfin id (32 lowercase hex digits); anything else is
+    returned unchanged. Only ids that unpack to the same string are packed.
+    """
+    if isinstance(value, str) and len(value) == 32:
+        try:
+            packed = bytes.fromhex(value)
+        except ValueError:
+            return value
+        if packed.hex() == value:
+            return packed
+    return value
+
+
+def unpack_id(value: Any) -> Any:
+    return value.hex() if isinstance(value, bytes) else value
+
+
+class JellyfinId(TypeDecorator):
+    """
+    A Jellyfin user or item id: a hex string to Python, stored as TEXT or,
+    with `compact_ids`, as a 16-byte BLOB. Values that aren't Jellyfin ids
+    stay TEXT either way, so a column may hold both.
+    """
+
+    impl = String
+    cache_ok = True
+    # Set from `settings.compact_ids` by backend.db, which converts the
+    # database to match in `init_db`.
+    compact = False
+
+    def process_bind_param(self, value, dialect):
+        return pack_id(value) if self.compact else value
+
+    def result_processor(self, dialect, coltype):
+        # `unpack_id` itself rather than TypeDecorator's wrapper around
+        # `process_result_value`: it runs for every id of every list served.
+        return unpack_id
+
+
+def id_text(column):
+    """
+    SQL expression reading an id column as hex text, whatever its storage.
+    """
+    return case(
+        (func.typeof(column) == "blob", func.lower(func.hex(column))),
+        else_=column,
+    )
+
+
 class Recommendation(Base):
     __tablename__ = "recommendations"
+    __table_args__ = (
+        # Serves per-item lookups; the primary key leads with user_id.
+        Index("ix_recommendations_item_id_user_id", "item_id", "user_id"),
+    )
 
-    user_id: Mapped[str] = mapped_column(String, primary_key=True)
-    item_id: Mapped[str] = mapped_column(String, primary_key=True)
-    username: Mapped[str | None] = mapped_column(String, nullable=True)
+    user_id: Mapped[str] = mapped_column(JellyfinId, primary_key=True)
+    item_id: Mapped[str] = mapped_column(JellyfinId, primary_key=True)
+    # Millisecond precision so the overview can order by recency. NULL for
+    # rows written before the column existed.
+    created_at: Mapped[datetime | None] = mapped_column(
+        DateTime,
+        nullable=True,
+        default=func.strftime("%Y-%m-%d %H:%M:%f", "now"),
+    )
 
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        Index("ix_comments_item_id_id", "item_id", "id"),
+        # Finds a user's comments when their name changes (see backend.db).
+        Index("ix_comments_user_id", "user_id"),
+    )
 
     id: Mapped[int] = mapped_column(
         Integer, primary_key=True, autoincrement=True
     )
-    user_id: Mapped[str | None] = mapped_column(String, nullable=True)
-    item_id: Mapped[str | None] = mapped_column(String, nullable=True)
-    username: Mapped[str | None] = mapped_column(String, nullable=True)
+    user_id: Mapped[str | None] = mapped_column(JellyfinId, nullable=True)
+    item_id: Mapped[str | None] = mapped_column(JellyfinId, nullable=True)
     comment: Mapped[str | None] = mapped_column(String, nullable=True)
 
 
+class User(Base):
+    # Jellyfin display names, one row per user, joined in by every read.
+    # Users without a row show as `User_xxxxxxxx` (see `display_username`).
+    __tablename__ = "users"
+
+    user_id: Mapped[str] = mapped_column(JellyfinId, primary_key=True)
+    name: Mapped[str] = mapped_column(String, nullable=False)
+    # Unix timestamp of the last time the name was written from Jellyfin;
+    # NULL for names carried over from the per-row copies or an import.
+    refreshed_at: Mapped[float | None] = mapped_column(Float, nullable=True)
+
+
+def display_username(user_id_column):
+    """
+    SQL expression for the name shown for `user_id_column`, the twin of
+    `fallback_username` for users without a row. The query must outer-join
+    `User` on the column.
+    """
+    return func.coalesce(
+        User.name, "User_" + func.substr(id_text(user_id_column), 1, 8)
+    )
+
+
+def select_recommendations():
+    """
+    Recommendations as the API serves them: ids and the display username.
+    """
+    return select(
+        Recommendation.user_id,
+        Recommendation.item_id,
+        display_username(Recommendation.user_id).label("username"),
+    ).outerjoin(User, User.user_id == Recommendation.user_id)
+
+
+def select_comments():
+    """
+    Comments as the API serves them, with the display username.
+    """
+    return select(
+        Comment.id,
+        Comment.user_id,
+        Comment.item_id,
+        display_username(Comment.user_id).label("username"),
+        Comment.comment,
+    ).outerjoin(User, User.user_id == Comment.user_id)
+
+
 class Setting(Base):
     __tablename__ = "settings"
 
@@ -38,5 +163,91 @@ class Setting(Base):
 class UserSetting(Base):
     __tablename__ = "user_settings"
 
-    user_id: Mapped[str] = mapped_column(String, primary_key=True)
+    user_id: Mapped[str] = mapped_column(JellyfinId, primary_key=True)
     user_limit: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+
+# Empty user_id key for the row that holds the total across all users.
+GLOBAL_COUNTER_KEY = ""
+
+
+class RecommendationCounter(Base):
+    # Maintained by triggers on `recommendations` (see backend.db), so limit
+    # checks are a primary-key lookup instead of a count(*).
+    __tablename__ = "recommendation_counters"
+
+    user_id: Mapped[str] = mapped_column(JellyfinId, primary_key=True)
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class ItemMetadata(Base):
+    # Persistent cache of Jellyfin item fields shown in the overview. A row
+    # with a NULL name records an id Jellyfin doesn't know.
+    __tablename__ = "item_metadata"
+
+    item_id: Mapped[str] = mapped_column(JellyfinId, primary_key=True)
+    name: Mapped[str | None] = mapped_column(String, nullable=True)
+    overview: Mapped[str | None] = mapped_column(String, nullable=True)
+    # JSON-encoded Jellyfin `ImageTags` mapping.
+    image_tags: Mapped[str | None] = mapped_column(String, nullable=True)
+    # Unix timestamp of the last successful fetch.
+    fetched_at: Mapped[float] = mapped_column(Float, nullable=False)
+
+
+class ItemVersion(Base):
+    # Bumped by triggers (see backend.db) whenever an item's comments or
+    # recommendations change; backs the per-item ETags.
+    __tablename__ = "item_versions"
+
+    item_id: Mapped[str] = mapped_column(JellyfinId, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class SettingsVersion(Base):
+    # Single row bumped by triggers (see backend.db) whenever `settings` or
+    # `user_settings` change; invalidates each worker's settings snapshot.
+    __tablename__ = "settings_version"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class ChangeLog(Base):
+    # Append-only feed of recommendation and comment changes, written by
+    # triggers (see backend.db) in the writer's transaction; backs
+    # `/changes`. AUTOINCREMENT keeps `seq` increasing across compactions.
+    __tablename__ = "change_log"
+    __table_args__ = (
+        Index("ix_change_log_item_id_seq", "item_id", "seq"),
+        {"sqlite_autoincrement": True},
+    )
+
+    seq: Mapped[int] = mapped_column(
+        Integer, primary_key=True, autoincrement=True
+    )
+    # "recommendation" or "comment".
+    kind: Mapped[str] = mapped_column(String, nullable=False)
+    # "upsert" or "delete"; a delete is kept as a tombstone.
+    op: Mapped[str] = mapped_column(String, nullable=False)
+    user_id: Mapped[str | None] = mapped_column(JellyfinId, nullable=True)
+    item_id: Mapped[str | None] = mapped_column(JellyfinId, nullable=True)
+    comment_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+
+class ChangeLogHorizon(Base):
+    # Single row: the highest `seq` dropped from `change_log` by compaction.
+    # Clients that last synced before it have missed changes and must
+    # reload in full.
+    __tablename__ = "change_log_horizon"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    seq: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class DatabaseOption(Base):
+    # Facts about the database file rather than app settings, e.g.
+    # `id_storage` ("text" or "blob", see JellyfinId).
+    __tablename__ = "database_options"
+
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    value: Mapped[str] = mapped_column(String, nullable=False)
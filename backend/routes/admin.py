@@ -1,32 +1,94 @@
-from flask import Blueprint, jsonify, request
-from sqlalchemy import delete, select
+import hmac
 
+from flask import (
+    Blueprint,
+    current_app,
+    jsonify,
+    request,
+    stream_with_context,
+)
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from backend.bulk import export_ndjson, import_ndjson, parse_tables
 from backend.db import db_session
+from backend.helpers import parse_limit, username_resolver
 from backend.logger import logger
-from backend.models import Comment, Setting, UserSetting
+from backend.models import Comment, Setting, UserSetting, select_comments
+from backend.routes.assets import reload_config
+from backend.routes.comments import serialize_comment
+from backend.settings import settings
+from backend.util import metrics
+from backend.util.comment_search import (
+    SEARCH_MAX_PAGE_SIZE,
+    SEARCH_PAGE_SIZE,
+    search_comments,
+)
+from backend.util.dumps import dump_response
+from backend.util.read_cache import item_response_cache
+from backend.util.settings_snapshot import (
+    mark_settings_changed,
+    settings_snapshot,
+)
 
 ADMIN_BP = Blueprint("admin", __name__, url_prefix="/admin")
 
 
 @ADMIN_BP.route("/comments", methods=["GET"])
 def get_all_comments():
+    """
+    Every comment: a JSON array, keyset pages with `limit`/`cursor`, or
+    streamed with `stream=ndjson|json` (see `dump_response`).
+    """
     logger.debug("Received /admin/comments request")
     try:
-        rows = db_session.scalars(select(Comment)).all()
-        comments = [
+        response = dump_response(
+            select_comments(),
+            order_by=[Comment.id],
+            serialize=serialize_comment,
+            key="comments",
+        )
+        logger.info("Serving comments dump for admin: %s", dict(request.args))
+        return response
+    except ValueError as e:
+        logger.warning("Bad /admin/comments request: %s", str(e))
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error("Error in /admin/comments: %s", str(e))
+        return jsonify({"error": str(e)}), 500
+
+
+@ADMIN_BP.route("/comments/search", methods=["GET"])
+def search_all_comments():
+    """
+    Full-text search over every comment: `q` (words, `word*` for a prefix),
+    optional `itemId`, `sort=rank|recent`, keyset pages via `limit`/`cursor`.
+    """
+    logger.debug("Received /admin/comments/search request")
+    try:
+        rows, next_cursor = search_comments(
+            request.args.get("q", ""),
+            limit=parse_limit(
+                request.args.get("limit"),
+                default=SEARCH_PAGE_SIZE,
+                maximum=SEARCH_MAX_PAGE_SIZE,
+            ),
+            cursor=request.args.get("cursor"),
+            sort=request.args.get("sort", "rank"),
+            item_id=request.args.get("itemId"),
+        )
+        logger.info("Comment search returned %s results", len(rows))
+        return jsonify(
             {
-                "id": row.id,
-                "userId": row.user_id,
-                "itemId": row.item_id,
-                "username": row.username,
-                "comment": row.comment,
+                "comments": [serialize_comment(row) for row in rows],
+                "nextCursor": next_cursor,
             }
-            for row in rows
-        ]
-        logger.info("Retrieved %s comments for admin", len(comments))
-        return jsonify(comments)
+        )
+    except ValueError as e:
+        logger.warning("Bad /admin/comments/search request: %s", str(e))
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        logger.error("Error in /admin/comments: %s", str(e))
+        logger.error("Error in /admin/comments/search: %s", str(e))
         return jsonify({"error": str(e)}), 500
 
 
@@ -68,22 +130,16 @@ def delete_comments_by_user(user_id):
 def get_settings():
     logger.debug("Received /admin/settings request")
     try:
-        global_limit = (
-            db_session.scalars(select(Setting.global_limit)).one_or_none() or 0
-        )
-        user_limits = {
-            row.user_id: row.user_limit
-            for row in db_session.scalars(select(UserSetting)).all()
-        }
+        limits = settings_snapshot.get()
         logger.info(
-            "Settings retrieved: global_limit=%s, userLimits=%s",
-            global_limit,
-            user_limits,
+            "Settings retrieved: global_limit=%s, %s user limits",
+            limits.global_limit,
+            len(limits.user_limits),
         )
         return jsonify(
             {
-                "globalLimit": global_limit,
-                "userLimits": user_limits,
+                "globalLimit": limits.global_limit,
+                "userLimits": limits.user_limits,
             }
         )
     except Exception as e:
@@ -91,31 +147,173 @@ def get_settings():
         return jsonify({"error": str(e)}), 500
 
 
+def _parse_user_limits(data: dict) -> dict[str, int]:
+    """
+    Per-user limits from a settings payload: the bulk `userLimits` mapping
+    and/or the single `userId`/`perUserLimit` pair.
+    """
+    user_limits = data.get("userLimits") or {}
+    if not isinstance(user_limits, dict):
+        raise ValueError("userLimits must be an object")
+    user_limits = dict(user_limits)
+    if data.get("userId"):
+        user_limits[data["userId"]] = data.get("perUserLimit", 0)
+    return {
+        str(user_id): int(limit or 0) for user_id, limit in user_limits.items()
+    }
+
+
 @ADMIN_BP.route("/settings", methods=["POST"])
 def save_settings():
+    """
+    Update the global limit (if `globalLimit` is given) and any number of
+    per-user limits in one transaction.
+    """
     logger.debug("Received /admin/settings POST request")
     try:
         data = request.get_json()
-        global_limit = data.get("globalLimit", 0)
-        user_id = data.get("userId")
-        per_user_limit = data.get("perUserLimit", 0)
+        user_limits = _parse_user_limits(data)
 
-        db_session.execute(delete(Setting))
-        db_session.add(Setting(global_limit=global_limit))
-        if user_id:
-            db_session.execute(
-                delete(UserSetting).where(UserSetting.user_id == user_id)
+        if "globalLimit" in data:
+            global_limit = int(data["globalLimit"] or 0)
+            updated = db_session.execute(
+                update(Setting).values(global_limit=global_limit)
             )
-            db_session.add(
-                UserSetting(user_id=user_id, user_limit=per_user_limit)
+            if not updated.rowcount:
+                db_session.add(Setting(global_limit=global_limit))
+        if user_limits:
+            stmt = sqlite_insert(UserSetting)
+            db_session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[UserSetting.user_id],
+                    set_={"user_limit": stmt.excluded.user_limit},
+                ),
+                [
+                    {"user_id": user_id, "user_limit": limit}
+                    for user_id, limit in user_limits.items()
+                ],
             )
+        mark_settings_changed()
         logger.info(
-            "Settings saved: global_limit=%s, user_id=%s, per_user_limit=%s",
-            global_limit,
-            user_id,
-            per_user_limit,
+            "Settings saved: global_limit=%s, %s user limits",
+            data.get("globalLimit"),
+            len(user_limits),
         )
         return jsonify({"status": "settings saved"})
+    except ValueError as e:
+        logger.warning("Bad /admin/settings request: %s", str(e))
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error("Error in /admin/settings: %s", str(e))
         return jsonify({"error": str(e)}), 500
+
+
+@ADMIN_BP.route("/export", methods=["GET"])
+def export_data():
+    """
+    Stream `tables` (default: all) as NDJSON; see `backend.bulk`.
+    """
+    logger.debug("Received /admin/export request")
+    try:
+        tables = parse_tables(request.args.get("tables"))
+        logger.info("Exporting %s", ", ".join(tables))
+        return current_app.response_class(
+            stream_with_context(export_ndjson(tables)),
+            mimetype="application/x-ndjson",
+            headers={
+                "Content-Disposition": "attachment; filename=updoot.ndjson"
+            },
+        )
+    except ValueError as e:
+        logger.warning("Bad /admin/export request: %s", str(e))
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error("Error in /admin/export: %s", str(e))
+        return jsonify({"error": str(e)}), 500
+
+
+@ADMIN_BP.route("/import", methods=["POST"])
+def import_data():
+    """
+    Upsert an NDJSON request body, as produced by /admin/export.
+    `keepIds=true` upserts comments on their id; only meant for restoring
+    this database's own export.
+    """
+    logger.debug("Received /admin/import request")
+    try:
+        keep_ids = request.args.get("keepIds", "").lower() in ("1", "true")
+        counts = import_ndjson(
+            request.stream,
+            progress=lambda counts: logger.info(
+                "Import progress: %s rows", sum(counts.values())
+            ),
+            keep_ids=keep_ids,
+        )
+        if counts["settings"] or counts["userSetting"]:
+            # Written outside db_session; other workers catch up through
+            # the settings version row.
+            settings_snapshot.invalidate()
+        logger.info("Import finished: %s", dict(counts))
+        return jsonify({"status": "imported", "counts": counts})
+    except ValueError as e:
+        logger.warning("Bad /admin/import request: %s", str(e))
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error("Error in /admin/import: %s", str(e))
+        return jsonify({"error": str(e)}), 500
+
+
+@ADMIN_BP.route("/username-cache", methods=["GET"])
+def get_username_cache_stats():
+    logger.debug("Received /admin/username-cache request")
+    return jsonify(username_resolver.cache.stats())
+
+
+@ADMIN_BP.route("/read-cache", methods=["GET"])
+def get_read_cache_stats():
+    logger.debug("Received /admin/read-cache request")
+    return jsonify(item_response_cache.stats())
+
+
+@ADMIN_BP.route("/reload-config", methods=["POST"])
+def reload_assets_config():
+    """
+    Recompute `cache_version` and the config.json body in the worker that
+    serves this request.
+    """
+    logger.debug("Received /admin/reload-config request")
+    try:
+        reload_config()
+        logger.info("Reloaded config.json: %s", settings.cache_version)
+        return jsonify(
+            {"status": "reloaded", "cacheVersion": settings.cache_version}
+        )
+    except Exception as e:
+        logger.error("Error in /admin/reload-config: %s", str(e))
+        return jsonify({"error": str(e)}), 500
+
+
+@ADMIN_BP.route("/metrics", methods=["GET"])
+def get_metrics():
+    """
+    Request, database and Jellyfin metrics summed over all workers, in the
+    Prometheus text format. Only served with the `metrics_token` bearer
+    token; without a configured token the endpoint doesn't exist.
+    """
+    logger.debug("Received /admin/metrics request")
+    if not settings.metrics_token:
+        return jsonify({"error": "Not found"}), 404
+    if not hmac.compare_digest(
+        request.headers.get("Authorization", ""),
+        f"Bearer {settings.metrics_token}",
+    ):
+        logger.warning("Rejected /admin/metrics request: bad token")
+        return jsonify({"error": "Unauthorized"}), 401
+    try:
+        body = metrics.render_prometheus(metrics.collect())
+        return current_app.response_class(
+            body, content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+    except Exception as e:
+        logger.error("Error in /admin/metrics: %s", str(e))
+        return jsonify({"error": str(e)}), 500
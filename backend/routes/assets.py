@@ -1,21 +1,36 @@
 from pathlib import Path
 
-from flask import Blueprint, jsonify, url_for
+from flask import Blueprint, current_app, jsonify, request, url_for
 
 from backend.logger import logger
 from backend.settings import PROJECT_ROOT, settings
+from backend.util.static_asset import PrecompressedAsset
 
 ASSETS_BP = Blueprint("assets", __name__, url_prefix="/assets")
 UPDOOT_JS_PATH = Path(f"{PROJECT_ROOT}/frontend/src/updoot.js")
+UPDOOT_JS = PrecompressedAsset(
+    UPDOOT_JS_PATH,
+    content_type="application/javascript; charset=utf-8",
+    # The URL is versioned with `cache_version`.
+    cache_control="public, max-age=31536000, immutable",
+)
 
+try:
+    UPDOOT_JS.load()
+except FileNotFoundError:
+    logger.error("updoot.js not found at %s", UPDOOT_JS_PATH)
 
-@ASSETS_BP.get("/config.json")
-def updoot_config():
+
+# Serialized config.json bodies, keyed by the request's script root.
+_config_bodies: dict[str, bytes] = {}
+
+
+def build_config_body() -> bytes:
     """
-    Serve runtime config for the Jellyfin injector/bootstrap script.
+    Serialize config.json for the current request context's script root.
 
-    Intentionally NOT cacheable: config should update immediately when env
-    changes.
+    Called with a test request context when the app starts, so requests to
+    the default root never build it; see `reload_config` to rebuild it.
     """
     cfg = {
         "updootSrc": url_for(
@@ -23,8 +38,35 @@ def updoot_config():
         ),
         "adminUserIds": settings.admin_user_ids,
     }
+    body = current_app.json.response(cfg).get_data()
+    _config_bodies[request.script_root] = body
+    return body
+
+
+def reload_config() -> bytes:
+    """
+    Recompute `cache_version` and rebuild the config.json body, in this
+    process only. Needs a request context, like `build_config_body`.
+    """
+    settings.reload_cache_version()
+    _config_bodies.clear()
+    return build_config_body()
 
-    resp = jsonify(cfg)
+
+@ASSETS_BP.get("/config.json")
+def updoot_config():
+    """
+    Serve runtime config for the Jellyfin injector/bootstrap script.
+
+    Intentionally NOT cacheable by clients, since it is fetched on every
+    Jellyfin page load and must carry the current `cache_version`. The body
+    only depends on settings, so it is prebuilt by `build_config_body`.
+    """
+    body = _config_bodies.get(request.script_root)
+    if body is None:
+        body = build_config_body()
+
+    resp = current_app.response_class(body, mimetype="application/json")
     resp.headers["Cache-Control"] = "no-store"
     return resp
 
@@ -32,10 +74,10 @@ def updoot_config():
 @ASSETS_BP.get("/updoot.<version>.js")
 def updoot_js(version: str):  # pylint: disable=unused-argument
     """
-    Serve the Jellyfin web mod script.
+    Serve the Jellyfin web mod script from memory, precompressed.
     """
     try:
-        body = UPDOOT_JS_PATH.read_text(encoding="utf-8")
+        return UPDOOT_JS.response(request, check_mtime=current_app.debug)
     except FileNotFoundError:
         logger.error("updoot.js not found at %s", UPDOOT_JS_PATH)
         return (
@@ -47,13 +89,3 @@ def updoot_js(version: str):  # pylint: disable=unused-argument
             ),
             500,
         )
-
-    return (
-        body,
-        200,
-        {
-            "Content-Type": "application/javascript; charset=utf-8",
-            "Cache-Control": "public, max-age=31536000, immutable",
-            "ETag": settings.cache_version,
-        },
-    )
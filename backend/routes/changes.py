@@ -0,0 +1,94 @@
+from flask import Blueprint, jsonify, request
+
+from backend.helpers import parse_limit
+from backend.logger import logger
+from backend.routes.comments import serialize_comment
+from backend.routes.recommendations import serialize_recommendation
+from backend.util.change_feed import (
+    CHANGES_MAX_PAGE_SIZE,
+    CHANGES_PAGE_SIZE,
+    change_log_horizon,
+    changes_since,
+    head_seq,
+)
+
+CHANGES_BP = Blueprint("changes", __name__, url_prefix="/changes")
+
+
+def serialize_change(entry, current) -> dict:
+    """
+    An upsert carries the row as it is now, so replaying a page is
+    idempotent; a delete (or an upsert of a row deleted since) is a
+    tombstone with only the row's key.
+    """
+    change = {"seq": entry.seq, "type": entry.kind}
+    if current is not None:
+        serialize = (
+            serialize_comment
+            if entry.kind == "comment"
+            else serialize_recommendation
+        )
+        return {**change, "op": "upsert", **serialize(current)}
+    change.update(op="delete", userId=entry.user_id, itemId=entry.item_id)
+    if entry.kind == "comment":
+        change["id"] = entry.comment_id
+    return change
+
+
+@CHANGES_BP.route("/", methods=["GET"])
+def get_changes():
+    """
+    Recommendation and comment changes after `since`, oldest first, in pages
+    of `limit`; `itemId` narrows them to one item. Answers 410 once `since`
+    is older than the compacted part of the log.
+    """
+    logger.debug("Received /changes request")
+    try:
+        if request.args.get("since") is None:
+            raise ValueError("Missing since")
+        since = int(request.args["since"])
+        limit = parse_limit(
+            request.args.get("limit"),
+            default=CHANGES_PAGE_SIZE,
+            maximum=CHANGES_MAX_PAGE_SIZE,
+        )
+        horizon = change_log_horizon()
+        if since < horizon:
+            logger.info("Change feed since=%s is past the horizon", since)
+            return (
+                jsonify(
+                    {
+                        "error": "Changes since this point were compacted; "
+                        "reload in full",
+                        "horizon": horizon,
+                    }
+                ),
+                410,
+            )
+        changes, next_since, has_more = changes_since(
+            since, limit, request.args.get("itemId")
+        )
+        logger.info("Serving %s changes since %s", len(changes), since)
+        return jsonify(
+            {
+                "changes": [serialize_change(*change) for change in changes],
+                "nextSince": next_since,
+                "hasMore": has_more,
+            }
+        )
+    except ValueError as e:
+        logger.warning("Bad /changes request: %s", str(e))
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error("Error in /changes: %s", str(e))
+        return jsonify({"error": str(e)}), 500
+
+
+@CHANGES_BP.route("/head", methods=["GET"])
+def get_changes_head():
+    logger.debug("Received /changes/head request")
+    try:
+        return jsonify({"seq": head_seq()})
+    except Exception as e:
+        logger.error("Error in /changes/head: %s", str(e))
+        return jsonify({"error": str(e)}), 500
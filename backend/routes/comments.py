@@ -1,15 +1,34 @@
 from flask import Blueprint, jsonify, request
-from sqlalchemy import select
 
-from backend.db import db_session
-from backend.helpers import get_jellyfin_username
+from backend.db import db_session, read_rows
+from backend.helpers import parse_limit
 from backend.logger import logger
-from backend.models import Comment
+from backend.models import Comment, select_comments
 from backend.settings import settings
+from backend.util.comment_search import (
+    SEARCH_MAX_PAGE_SIZE,
+    SEARCH_PAGE_SIZE,
+    search_comments,
+)
+from backend.util.read_cache import cached_item_response
+from backend.util.username_backfill import schedule_username_backfill
+from backend.util.write_queue import write_queue
 
 COMMENTS_BP = Blueprint("comments", __name__, url_prefix="/comments")
 
 
+def serialize_comment(row) -> dict:
+    # By position: `row` starts with the columns of `select_comments()`, and
+    # indexing a Row is several times cheaper than attribute access.
+    return {
+        "id": row[0],
+        "userId": row[1],
+        "itemId": row[2],
+        "username": row[3],
+        "comment": row[4],
+    }
+
+
 @COMMENTS_BP.route("/", methods=["POST"])
 def add_comment():
     logger.debug("Received /comments request")
@@ -27,21 +46,14 @@ def add_comment():
                 400,
             )
 
-        username = get_jellyfin_username(user_id)
-        db_session.add(
-            Comment(
-                user_id=user_id,
-                item_id=item_id,
-                username=username,
-                comment=comment,
+        if settings.write_queue:
+            write_queue.add_comment(user_id, item_id, comment)
+        else:
+            db_session.add(
+                Comment(user_id=user_id, item_id=item_id, comment=comment)
             )
-        )
-        logger.info(
-            "Comment added: user_id=%s, item_id=%s, username=%s",
-            user_id,
-            item_id,
-            username,
-        )
+            schedule_username_backfill(user_id)
+        logger.info("Comment added: user_id=%s, item_id=%s", user_id, item_id)
         return jsonify({"status": "comment added"})
     except Exception as e:
         logger.error("Error in /comments: %s", str(e))
@@ -51,26 +63,55 @@ def add_comment():
 @COMMENTS_BP.route("/<item_id>", methods=["GET"])
 def get_comments_for_item(item_id):
     logger.debug("Received /comments/%s request", item_id)
+
+    def load_comments():
+        comment_rows = read_rows(
+            select_comments().where(Comment.item_id == item_id)
+        ).all()
+        comments = [serialize_comment(row) for row in comment_rows]
+        logger.info(
+            "Retrieved %s comments for item_id=%s", len(comments), item_id
+        )
+        return comments
+
     try:
-        comment_rows = db_session.scalars(
-            select(Comment).where(Comment.item_id == item_id)
+        return cached_item_response("comments", item_id, load_comments)
+    except Exception as e:
+        logger.error("Error in /comments/%s: %s", item_id, str(e))
+        return jsonify({"error": str(e)}), 500
+
+
+@COMMENTS_BP.route("/<item_id>/search", methods=["GET"])
+def search_comments_for_item(item_id):
+    logger.debug("Received /comments/%s/search request", item_id)
+    try:
+        rows, next_cursor = search_comments(
+            request.args.get("q", ""),
+            limit=parse_limit(
+                request.args.get("limit"),
+                default=SEARCH_PAGE_SIZE,
+                maximum=SEARCH_MAX_PAGE_SIZE,
+            ),
+            cursor=request.args.get("cursor"),
+            sort=request.args.get("sort", "rank"),
+            item_id=item_id,
         )
-        comments = [
+        logger.info(
+            "Comment search for item_id=%s returned %s results",
+            item_id,
+            len(rows),
+        )
+        return jsonify(
             {
-                "id": row.id,
-                "userId": row.user_id,
-                "itemId": row.item_id,
-                "username": row.username,
-                "comment": row.comment,
+                "comments": [serialize_comment(row) for row in rows],
+                "nextCursor": next_cursor,
             }
-            for row in comment_rows
-        ]
-        logger.info(
-            "Retrieved %s comments for item_id=%s", len(comments), item_id
         )
-        return jsonify(comments)
+    except ValueError as e:
+        logger.warning("Bad /comments/%s/search request: %s", item_id, str(e))
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        logger.error("Error in /comments/%s: %s", item_id, str(e))
+        logger.error("Error in /comments/%s/search: %s", item_id, str(e))
         return jsonify({"error": str(e)}), 500
 
 
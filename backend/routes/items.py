@@ -0,0 +1,149 @@
+from flask import Blueprint, jsonify, request
+from sqlalchemy import func, select
+
+from backend.db import db_session, read_rows
+from backend.logger import logger
+from backend.models import (
+    Comment,
+    Recommendation,
+    select_comments,
+    select_recommendations,
+)
+from backend.routes.comments import serialize_comment
+from backend.routes.recommendations import serialize_recommendation
+from backend.util.etags import item_etag, not_modified, with_etag
+from backend.util.item_metadata import get_item_metadata
+
+ITEMS_BP = Blueprint("items", __name__, url_prefix="/items")
+MAX_ITEM_IDS = 500
+
+
+def parse_item_ids(value: str | None) -> list[str]:
+    """
+    Parse a comma-separated `ids` query parameter.
+    """
+    item_ids = [v.strip() for v in (value or "").split(",") if v.strip()]
+    if not item_ids:
+        raise ValueError("Missing ids")
+    if len(item_ids) > MAX_ITEM_IDS:
+        raise ValueError(f"At most {MAX_ITEM_IDS} ids per request")
+    return item_ids
+
+
+@ITEMS_BP.route("/metadata", methods=["GET"])
+def get_items_metadata():
+    logger.debug("Received /items/metadata request")
+    try:
+        item_ids = parse_item_ids(request.args.get("ids"))
+        metadata = get_item_metadata(item_ids)
+        logger.info("Retrieved metadata for %s items", len(metadata))
+        return jsonify({"items": metadata})
+    except ValueError as e:
+        logger.warning("Bad /items/metadata request: %s", str(e))
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error("Error in /items/metadata: %s", str(e))
+        return jsonify({"error": str(e)}), 500
+
+
+@ITEMS_BP.route("/<item_id>/summary", methods=["GET"])
+def get_item_summary(item_id):
+    """
+    Comments, recommendations and counts for one item in a single request.
+
+    `recommended` reflects the optional `userId` query parameter.
+    """
+    logger.debug("Received /items/%s/summary request", item_id)
+    try:
+        etag = item_etag("summary", item_id)
+        if cached := not_modified(etag):
+            return cached
+
+        user_id = request.args.get("userId")
+        comments = [
+            serialize_comment(row)
+            for row in read_rows(
+                select_comments().where(Comment.item_id == item_id)
+            ).all()
+        ]
+        recommendations = [
+            serialize_recommendation(row)
+            for row in read_rows(
+                select_recommendations().where(
+                    Recommendation.item_id == item_id
+                )
+            ).all()
+        ]
+        logger.info(
+            "Retrieved summary for item_id=%s: %s comments, "
+            "%s recommendations",
+            item_id,
+            len(comments),
+            len(recommendations),
+        )
+        response = jsonify(
+            {
+                "itemId": item_id,
+                "comments": comments,
+                "commentCount": len(comments),
+                "recommendations": recommendations,
+                "recommendationCount": len(recommendations),
+                "recommended": any(
+                    rec["userId"] == user_id for rec in recommendations
+                ),
+            }
+        )
+        return with_etag(response, etag)
+    except Exception as e:
+        logger.error("Error in /items/%s/summary: %s", item_id, str(e))
+        return jsonify({"error": str(e)}), 500
+
+
+@ITEMS_BP.route("/summary", methods=["GET"])
+def get_items_summary():
+    """
+    Badge data for many items (`ids`, comma-separated) in one request: the
+    comment and recommendation counts, and whether `userId` recommended it.
+    """
+    logger.debug("Received /items/summary request")
+    try:
+        item_ids = parse_item_ids(request.args.get("ids"))
+        user_id = request.args.get("userId")
+        summaries = {
+            item_id: {
+                "commentCount": 0,
+                "recommendationCount": 0,
+                "recommended": False,
+            }
+            for item_id in item_ids
+        }
+
+        recommendation_rows = db_session.execute(
+            select(
+                Recommendation.item_id,
+                func.count(),
+                func.max(Recommendation.user_id == user_id),
+            )
+            .where(Recommendation.item_id.in_(item_ids))
+            .group_by(Recommendation.item_id)
+        )
+        for item_id, count, recommended in recommendation_rows:
+            summaries[item_id]["recommendationCount"] = count
+            summaries[item_id]["recommended"] = bool(recommended)
+
+        comment_rows = db_session.execute(
+            select(Comment.item_id, func.count())
+            .where(Comment.item_id.in_(item_ids))
+            .group_by(Comment.item_id)
+        )
+        for item_id, count in comment_rows:
+            summaries[item_id]["commentCount"] = count
+
+        logger.info("Retrieved summaries for %s items", len(summaries))
+        return jsonify({"items": summaries})
+    except ValueError as e:
+        logger.warning("Bad /items/summary request: %s", str(e))
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error("Error in /items/summary: %s", str(e))
+        return jsonify({"error": str(e)}), 500
@@ -1,18 +1,157 @@
+import json
+
 from flask import Blueprint, jsonify, request
-from sqlalchemy import func, select
+from sqlalchemy import (
+    String,
+    and_,
+    delete,
+    func,
+    literal,
+    or_,
+    select,
+    type_coerce,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
-from backend.db import db_session
-from backend.helpers import get_jellyfin_username
+from backend.db import db_session, read_rows
+from backend.helpers import decode_cursor, encode_cursor, parse_limit
 from backend.logger import logger
-from backend.models import Recommendation, Setting, UserSetting
+from backend.models import (
+    GLOBAL_COUNTER_KEY,
+    Recommendation,
+    RecommendationCounter,
+    User,
+    display_username,
+    select_recommendations,
+)
+from backend.settings import settings
+from backend.util.dumps import dump_response
+from backend.util.item_metadata import get_item_metadata
+from backend.util.read_cache import cached_item_response
+from backend.util.settings_snapshot import LimitSettings, settings_snapshot
+from backend.util.username_backfill import schedule_username_backfill
+from backend.util.write_queue import ToggleResult, write_queue
 
 RECOMMENDATIONS_BP = Blueprint(
     "recommendations", __name__, url_prefix="/recommendations"
 )
+GROUPED_PAGE_SIZE = 50
+GROUPED_MAX_PAGE_SIZE = 500
+
+
+def serialize_recommendation(row) -> dict:
+    # By position, like `serialize_comment`: the columns of
+    # `select_recommendations()`.
+    return {
+        "userId": row[0],
+        "itemId": row[1],
+        "username": row[2],
+    }
+
+
+def _recommendation_count(counter_key: str) -> int:
+    counter = db_session.get(RecommendationCounter, counter_key)
+    return counter.total if counter else 0
+
+
+def _counter_total(counter_key):
+    return func.coalesce(
+        select(RecommendationCounter.total)
+        .where(RecommendationCounter.user_id == counter_key)
+        .scalar_subquery(),
+        0,
+    )
+
+
+def _within_limits(user_id: str, limits: LimitSettings) -> list:
+    """
+    SQL conditions that hold while neither the global nor the user's
+    recommendation limit (0 = unlimited) has been reached.
+
+    The limits come from the settings snapshot; only the counters are read
+    in SQL, in the same statement as the INSERT.
+    """
+    conditions = []
+    if limits.global_limit > 0:
+        conditions.append(
+            _counter_total(GLOBAL_COUNTER_KEY) < limits.global_limit
+        )
+    user_limit = limits.user_limit(user_id)
+    if user_limit > 0:
+        conditions.append(_counter_total(user_id) < user_limit)
+    return conditions
+
+
+def _limit_error(limits: LimitSettings, user_id: str) -> str:
+    total = _recommendation_count(GLOBAL_COUNTER_KEY)
+    if 0 < limits.global_limit <= total:
+        logger.warning(
+            "Global recommendation limit reached: %s/%s",
+            total,
+            limits.global_limit,
+        )
+        return "Global recommendation limit reached"
+
+    logger.warning("User %s recommendation limit reached", user_id)
+    return "User recommendation limit reached"
+
+
+def _toggle(user_id: str, item_id: str, limits: LimitSettings) -> ToggleResult:
+    """
+    Toggle in the request's own transaction.
+
+    The toggle is atomic: the DELETE is the first statement of the
+    transaction, so it takes SQLite's write lock before anything is read.
+    If nothing was deleted, the INSERT only happens when the limit checks
+    (evaluated in the same statement) pass. Concurrent double-clicks from
+    several workers are serialized rather than lost or duplicated.
+    """
+    deleted = db_session.execute(
+        delete(Recommendation)
+        .where(
+            Recommendation.user_id == user_id,
+            Recommendation.item_id == item_id,
+        )
+        .returning(Recommendation.user_id)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+    if deleted:
+        status = "unrecommended"
+    else:
+        inserted = db_session.execute(
+            sqlite_insert(Recommendation)
+            .from_select(
+                ["user_id", "item_id"],
+                select(
+                    literal(user_id, Recommendation.user_id.type),
+                    literal(item_id, Recommendation.item_id.type),
+                ).where(*_within_limits(user_id, limits)),
+            )
+            .on_conflict_do_nothing()
+            .returning(Recommendation.user_id)
+        ).first()
+        if not inserted:
+            return ToggleResult(None, error=_limit_error(limits, user_id))
+
+        schedule_username_backfill(user_id)
+        status = "recommended"
+
+    count = db_session.scalar(
+        select(func.count())
+        .select_from(Recommendation)
+        .where(Recommendation.item_id == item_id)
+    )
+    return ToggleResult(status, count)
 
 
 @RECOMMENDATIONS_BP.route("/", methods=["POST"])
 def add_recommendation():
+    """
+    Toggle the caller's recommendation of an item, in the request's own
+    transaction or, with `write_queue`, batched with other requests' writes.
+    Either way the response is sent once the change is committed.
+    """
     logger.debug("Received /recommendations request")
     try:
         data = request.get_json()
@@ -24,71 +163,29 @@ def add_recommendation():
             )
             return jsonify({"error": "Missing userId or itemId"}), 400
 
-        global_limit = (
-            db_session.scalars(select(Setting.global_limit)).one_or_none() or 0
-        )
-        if global_limit > 0:
-            total = db_session.scalar(
-                select(func.count()).select_from(Recommendation)
+        limits = settings_snapshot.get()
+        if settings.write_queue:
+            result = write_queue.toggle_recommendation(
+                user_id, item_id, limits
             )
-            if total >= global_limit:
-                logger.warning(
-                    "Global recommendation limit reached: %s/%s",
-                    total,
-                    global_limit,
-                )
-                return (
-                    jsonify({"error": "Global recommendation limit reached"}),
-                    403,
-                )
+        else:
+            result = _toggle(user_id, item_id, limits)
+        if result.error:
+            return jsonify({"error": result.error}), 403
 
-        user_limit = (
-            db_session.scalars(
-                select(UserSetting.user_limit).where(
-                    UserSetting.user_id == user_id
-                )
-            ).one_or_none()
-            or 0
+        logger.info(
+            "%s: user_id=%s, item_id=%s",
+            result.status.capitalize(),
+            user_id,
+            item_id,
+        )
+        return jsonify(
+            {
+                "status": result.status,
+                "recommended": result.status == "recommended",
+                "count": result.count,
+            }
         )
-        if user_limit > 0:
-            user_count = db_session.scalar(
-                select(func.count())
-                .select_from(Recommendation)
-                .where(Recommendation.user_id == user_id)
-            )
-            if user_count >= user_limit:
-                logger.warning(
-                    "User %s recommendation limit reached: %s/%s",
-                    user_id,
-                    user_count,
-                    user_limit,
-                )
-                return (
-                    jsonify({"error": "User recommendation limit reached"}),
-                    403,
-                )
-
-        existing = db_session.get(Recommendation, (user_id, item_id))
-        username = get_jellyfin_username(user_id)
-        if existing:
-            db_session.delete(existing)
-            logger.info(
-                "Unrecommended: user_id=%s, item_id=%s", user_id, item_id
-            )
-            return jsonify({"status": "unrecommended"})
-        else:
-            db_session.add(
-                Recommendation(
-                    user_id=user_id, item_id=item_id, username=username
-                )
-            )
-            logger.info(
-                "Recommended: user_id=%s, item_id=%s, username=%s",
-                user_id,
-                item_id,
-                username,
-            )
-            return jsonify({"status": "recommended"})
     except Exception as e:
         logger.error("Error in /recommendations: %s", str(e))
         return jsonify({"error": str(e)}), 500
@@ -96,45 +193,143 @@ def add_recommendation():
 
 @RECOMMENDATIONS_BP.route("/", methods=["GET"])
 def get_recommendations():
+    """
+    Every recommendation: a JSON array, keyset pages with `limit`/`cursor`,
+    or streamed with `stream=ndjson|json` (see `dump_response`).
+    """
     logger.debug("Received /recommendations request")
     try:
-        rows = db_session.scalars(select(Recommendation)).all()
-        recommendations = [
+        response = dump_response(
+            select_recommendations(),
+            order_by=[Recommendation.user_id, Recommendation.item_id],
+            serialize=serialize_recommendation,
+            key="recommendations",
+        )
+        logger.info("Serving recommendations dump: %s", dict(request.args))
+        return response
+    except ValueError as e:
+        logger.warning("Bad /recommendations request: %s", str(e))
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error("Error in /recommendations: %s", str(e))
+        return jsonify({"error": str(e)}), 500
+
+
+def _usernames_by_item(item_ids: list[str]) -> dict[str, list[str]]:
+    # Only the page's items are joined to `users`, not every row grouped.
+    if not item_ids:
+        return {}
+    rows = db_session.execute(
+        select(
+            Recommendation.item_id,
+            func.json_group_array(
+                display_username(Recommendation.user_id)
+            ).label("usernames"),
+        )
+        .outerjoin(User, User.user_id == Recommendation.user_id)
+        .where(Recommendation.item_id.in_(item_ids))
+        .group_by(Recommendation.item_id)
+    )
+    return {row.item_id: json.loads(row.usernames) for row in rows}
+
+
+@RECOMMENDATIONS_BP.route("/grouped", methods=["GET"])
+def get_grouped_recommendations():
+    """
+    One entry per recommended item, most recently recommended first.
+
+    Paginated with `limit` and the opaque `cursor` returned as `nextCursor`
+    (null on the last page). With `include=metadata`, each entry also
+    carries the cached Jellyfin item fields under `item`.
+    """
+    logger.debug("Received /recommendations/grouped request")
+    try:
+        limit = parse_limit(
+            request.args.get("limit"),
+            default=GROUPED_PAGE_SIZE,
+            maximum=GROUPED_MAX_PAGE_SIZE,
+        )
+        last_recommended = func.coalesce(
+            func.max(type_coerce(Recommendation.created_at, String)), ""
+        )
+        stmt = (
+            select(
+                Recommendation.item_id,
+                func.count().label("count"),
+                last_recommended.label("last_recommended"),
+            )
+            .group_by(Recommendation.item_id)
+            .order_by(last_recommended.desc(), Recommendation.item_id)
+            .limit(limit + 1)
+        )
+        cursor = request.args.get("cursor")
+        if cursor:
+            cursor_last, cursor_item_id = decode_cursor(cursor)
+            stmt = stmt.having(
+                or_(
+                    last_recommended < cursor_last,
+                    and_(
+                        last_recommended == cursor_last,
+                        Recommendation.item_id > cursor_item_id,
+                    ),
+                )
+            )
+
+        rows = db_session.execute(stmt).all()
+        page = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor(
+                page[-1].last_recommended, page[-1].item_id
+            )
+        usernames = _usernames_by_item([row.item_id for row in page])
+        items = [
             {
-                "userId": row.user_id,
                 "itemId": row.item_id,
-                "username": row.username,
+                "count": row.count,
+                "usernames": usernames.get(row.item_id, []),
+                "lastRecommendedAt": (
+                    f"{row.last_recommended.replace(' ', 'T')}Z"
+                    if row.last_recommended
+                    else None
+                ),
             }
-            for row in rows
+            for row in page
         ]
-        logger.info("Retrieved %s recommendations", len(recommendations))
-        return jsonify(recommendations)
+        if "metadata" in request.args.get("include", "").split(","):
+            metadata = get_item_metadata(item["itemId"] for item in items)
+            for item in items:
+                item["item"] = metadata[item["itemId"]]
+        logger.info("Retrieved %s grouped recommendations", len(items))
+        return jsonify({"items": items, "nextCursor": next_cursor})
+    except ValueError as e:
+        logger.warning("Bad /recommendations/grouped request: %s", str(e))
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        logger.error("Error in /recommendations: %s", str(e))
+        logger.error("Error in /recommendations/grouped: %s", str(e))
         return jsonify({"error": str(e)}), 500
 
 
 @RECOMMENDATIONS_BP.route("/<item_id>", methods=["GET"])
 def get_recommendations_for_item(item_id):
     logger.debug("Received /recommendations/%s request", item_id)
-    try:
-        rows = db_session.scalars(
-            select(Recommendation).where(Recommendation.item_id == item_id)
+
+    def load_recommendations():
+        rows = read_rows(
+            select_recommendations().where(Recommendation.item_id == item_id)
         ).all()
-        recommendations = [
-            {
-                "userId": row.user_id,
-                "itemId": row.item_id,
-                "username": row.username,
-            }
-            for row in rows
-        ]
+        recommendations = [serialize_recommendation(row) for row in rows]
         logger.info(
             "Retrieved %s recommendations for item_id=%s",
             len(recommendations),
             item_id,
         )
-        return jsonify(recommendations)
+        return recommendations
+
+    try:
+        return cached_item_response(
+            "recommendations", item_id, load_recommendations
+        )
     except Exception as e:
         logger.error("Error in /recommendations/%s: %s", item_id, str(e))
         return jsonify({"error": str(e)}), 500
@@ -1,6 +1,7 @@
 import hashlib
 import logging
 import tomllib
+from functools import cached_property
 from pathlib import Path
 from typing import Annotated, Any
 
@@ -18,19 +19,90 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
     db_path: str = f"{PROJECT_ROOT}/data/recommendations.db"
+    # SQLite engine profile, applied to every new connection. WAL lets
+    # readers proceed while a writer commits and, together with the busy
+    # timeout, lets several gunicorn workers share the database.
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 16384
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_pool_size: int = 5
+    sqlite_pool_max_overflow: int = 10
+    # Store Jellyfin ids as 16-byte BLOBs instead of 32-character TEXT.
+    # `init_db` converts an existing database in place either way.
+    compact_ids: bool = False
     app_root_path: str = "/updoot"
     jellyfin_url: str
     jellyfin_api_key: str
+    # Seconds before an outbound Jellyfin request is abandoned.
+    jellyfin_timeout: float = 5.0
+    # Max keep-alive connections held open to Jellyfin per worker.
+    jellyfin_pool_size: int = 10
+    # Process-wide username cache. Failed lookups are cached for the (much
+    # shorter) negative TTL so a Jellyfin outage doesn't stall every write.
+    username_cache_size: int = 5000
+    username_cache_ttl: float = 3600.0
+    username_negative_cache_ttl: float = 60.0
+    username_cache_warmup: bool = True
+    # Background worker that fills in the `users` table for users first seen
+    # on a write. Each sweep also refreshes every name from Jellyfin /Users.
+    username_backfill_batch_size: int = 100
+    username_backfill_delay: float = 0.5
+    username_backfill_sweep_interval: float = 900.0
+    # Write-behind mode: recommendation toggles and new comments are applied
+    # by one writer thread per worker, in transactions of up to
+    # `write_queue_max_batch` writes, closed at most `write_queue_max_delay`
+    # seconds after the first, always with synchronous=FULL. Only useful
+    # with threaded gunicorn workers.
+    write_queue: bool = False
+    write_queue_max_batch: int = 256
+    write_queue_max_delay: float = 0.002
+    # Jellyfin item metadata (name, overview, image tags) is cached in SQLite
+    # for this many seconds and fetched in batches of up to this many ids.
+    item_metadata_ttl: float = 86400.0
+    item_metadata_batch_size: int = 100
+    # Per-worker cache of serialized per-item comment/recommendation lists,
+    # invalidated through `item_versions` so writes from any worker show up.
+    read_cache_max_entries: int = 10000
+    read_cache_max_bytes: int = 64 * 1024 * 1024
+    # JSON encoder for responses: "orjson", "default" (Flask's, built on the
+    # standard library) or "auto", which uses orjson when it's installed.
+    json_provider: str = "auto"
+    # Each worker flushes its metrics to a file in this directory (default:
+    # `metrics/` next to the database) every `metrics_flush_interval`
+    # seconds; /admin/metrics sums them. That endpoint requires
+    # `Authorization: Bearer <metrics_token>` and is off (404) while the
+    # token is empty.
+    metrics_dir: str = ""
+    metrics_flush_interval: float = 5.0
+    metrics_token: str = ""
+    # The change log behind `/changes` is compacted every
+    # `change_log_compact_interval` seconds down to the newest
+    # `change_log_max_entries` entries, one per changed row.
+    change_log_max_entries: int = 100_000
+    change_log_compact_interval: float = 600.0
+    # How long (seconds) a worker trusts its in-memory copy of the
+    # recommendation limits before re-checking `settings_version`.
+    settings_snapshot_max_age: float = 1.0
     # Accept comma-separated values from env without requiring JSON syntax.
     # (By default, pydantic-settings tries to JSON-decode list fields.)
     admin_user_ids: Annotated[list[str], NoDecode] = []
     log_level: int = logging.INFO
+    # Empty disables the log file. It is shared by all workers and never
+    # rotated by the app; rotate it externally (e.g. logrotate).
+    log_file: str = "./flask-app.log"
+    # "text" or "json" (one object per line).
+    log_format: str = "text"
+    # Fraction of INFO lines kept per Flask endpoint, e.g.
+    # "comments.get_comments_for_item=0.1,items.get_items_summary=0.01".
+    log_sample_rates: Annotated[dict[str, float], NoDecode] = {}
     cache_version_override: str = Field(
         default="1",
         validation_alias="cache_version",
     )
 
-    @property
+    @cached_property
     def cache_version(self) -> str:
         """
         Computes a cache version using a hash that includes:
@@ -43,11 +115,19 @@ class Settings(BaseSettings):
 
         Note that we do not include any additional config options that are
         served to the client, since these are not cached.
+
+        Computed once per process; see `reload_cache_version`.
         """
         values = [_get_project_version(), self.cache_version_override]
         values_str = "|".join(values)
         return hashlib.sha256(values_str.encode("utf-8")).hexdigest()
 
+    def reload_cache_version(self) -> None:
+        """
+        Forget the memoized `cache_version`, e.g. after pyproject.toml changed.
+        """
+        self.__dict__.pop("cache_version", None)
+
     @field_validator("app_root_path", mode="before")
     @classmethod
     def _normalize_app_root_path(cls, v: Any) -> str | None:
@@ -69,6 +149,31 @@ class Settings(BaseSettings):
 
         return [val.strip() for val in user_ids if val.strip()]
 
+    @field_validator("sqlite_journal_mode", mode="before")
+    @classmethod
+    def _normalize_sqlite_journal_mode(cls, v: Any) -> str:
+        # Interpolated into a PRAGMA, so only accept known values.
+        v = str(v).strip().upper()
+        if v not in {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}:
+            raise ValueError(f"Invalid sqlite_journal_mode: {v}")
+        return v
+
+    @field_validator("sqlite_synchronous", mode="before")
+    @classmethod
+    def _normalize_sqlite_synchronous(cls, v: Any) -> str:
+        v = str(v).strip().upper()
+        if v not in {"OFF", "NORMAL", "FULL", "EXTRA"}:
+            raise ValueError(f"Invalid sqlite_synchronous: {v}")
+        return v
+
+    @field_validator("json_provider", mode="before")
+    @classmethod
+    def _normalize_json_provider(cls, v: Any) -> str:
+        v = str(v).strip().lower()
+        if v not in {"auto", "orjson", "default"}:
+            raise ValueError(f"Invalid json_provider: {v}")
+        return v
+
     @field_validator("log_level", mode="before")
     @classmethod
     def _normalize_log_level(cls, v: Any) -> int | None:
@@ -77,6 +182,29 @@ class Settings(BaseSettings):
             return getattr(logging, v)
         return v
 
+    @field_validator("log_format", mode="before")
+    @classmethod
+    def _normalize_log_format(cls, v: Any) -> str:
+        v = str(v).strip().lower()
+        if v not in {"text", "json"}:
+            raise ValueError(f"Invalid log_format: {v}")
+        return v
+
+    @field_validator("log_sample_rates", mode="before")
+    @classmethod
+    def _parse_log_sample_rates(cls, v: Any) -> dict[str, float]:
+        if isinstance(v, dict):
+            return v
+        rates = {}
+        for pair in str(v or "").split(","):
+            if not pair.strip():
+                continue
+            endpoint, sep, rate = pair.partition("=")
+            if not sep:
+                raise ValueError(f"Invalid log_sample_rates entry: {pair}")
+            rates[endpoint.strip()] = float(rate)
+        return rates
+
     @field_validator("jellyfin_url", mode="before")
     @classmethod
     def _normalize_jellyfin_url(cls, v: Any) -> str | None:
@@ -91,9 +219,19 @@ settings = Settings()  # type: ignore[call-arg]
 def _get_project_version() -> str:
     """
     Return the version of the application from the pyproject.toml file.
+
+    Falls back to "unknown" when the file isn't shipped (e.g. a slimmed-down
+    image), leaving `CACHE_VERSION` as the only cache-busting input.
     """
     file_path = Path(f"{PROJECT_ROOT}/pyproject.toml")
-    data = tomllib.loads(file_path.read_text(encoding="utf-8"))
+    try:
+        text = file_path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        logging.getLogger(__name__).warning(
+            "%s not found; set CACHE_VERSION to bust client caches", file_path
+        )
+        return "unknown"
+    data = tomllib.loads(text)
     version = data.get("project", {}).get("version")
     if version is None:
         raise ValueError("Version not found in pyproject.toml")
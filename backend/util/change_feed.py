@@ -0,0 +1,206 @@
+import os
+import threading
+import time
+
+from sqlalchemy import Row, delete, func, select, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from backend.db import ENGINE, db_session
+from backend.logger import logger
+from backend.models import (
+    ChangeLog,
+    ChangeLogHorizon,
+    Comment,
+    Recommendation,
+    select_comments,
+    select_recommendations,
+)
+from backend.settings import settings
+
+CHANGES_PAGE_SIZE = 500
+CHANGES_MAX_PAGE_SIZE = 5000
+# Entries deleted per transaction when truncating the log.
+COMPACT_BATCH_SIZE = 20_000
+
+# Entries for the same row collapse into the newest one.
+_KEY = (
+    ChangeLog.kind,
+    ChangeLog.user_id,
+    ChangeLog.item_id,
+    ChangeLog.comment_id,
+)
+
+_compactor_pid: int | None = None
+
+
+def change_log_horizon() -> int:
+    """
+    Highest sequence number dropped by compaction; `since` values below it
+    can no longer be served.
+    """
+    return db_session.scalar(select(ChangeLogHorizon.seq)) or 0
+
+
+def head_seq() -> int:
+    """
+    Sequence number of the latest change, to start syncing from after a
+    full download.
+    """
+    latest = db_session.scalar(select(func.max(ChangeLog.seq)))
+    return latest or change_log_horizon()
+
+
+def changes_since(
+    since: int, limit: int, item_id: str | None = None
+) -> tuple[list[tuple[ChangeLog, Row | None]], int, bool]:
+    """
+    Up to `limit` change-log entries after `since`, oldest first, each with
+    the current row it refers to (None once deleted). Only the newest entry
+    per row is kept within a page.
+
+    Returns the entries, the `since` to pass for the next page and whether
+    more changes are waiting.
+    """
+    stmt = (
+        select(ChangeLog)
+        .where(ChangeLog.seq > since)
+        .order_by(ChangeLog.seq)
+        .limit(limit + 1)
+    )
+    if item_id is not None:
+        stmt = stmt.where(ChangeLog.item_id == item_id)
+    entries = db_session.scalars(stmt).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    next_since = entries[-1].seq if entries else since
+
+    latest: dict[tuple, ChangeLog] = {}
+    for entry in entries:
+        key = (entry.kind, entry.user_id, entry.item_id, entry.comment_id)
+        latest.pop(key, None)
+        latest[key] = entry
+
+    recommendations = _current_recommendations(
+        [
+            (e.user_id, e.item_id)
+            for e in latest.values()
+            if e.kind == "recommendation" and e.op == "upsert"
+        ]
+    )
+    comments = _current_comments(
+        [
+            e.comment_id
+            for e in latest.values()
+            if e.kind == "comment" and e.op == "upsert"
+        ]
+    )
+    changes = []
+    for entry in latest.values():
+        current = None
+        if entry.op == "upsert":
+            if entry.kind == "recommendation":
+                current = recommendations.get((entry.user_id, entry.item_id))
+            else:
+                current = comments.get(entry.comment_id)
+                # Moved to another item since: gone from this one.
+                if current is not None and current.item_id != entry.item_id:
+                    current = None
+        changes.append((entry, current))
+    return changes, next_since, has_more
+
+
+def _current_recommendations(keys: list[tuple[str, str]]) -> dict:
+    if not keys:
+        return {}
+    rows = db_session.execute(
+        select_recommendations().where(
+            tuple_(Recommendation.user_id, Recommendation.item_id).in_(keys)
+        )
+    )
+    return {(row.user_id, row.item_id): row for row in rows}
+
+
+def _current_comments(ids: list[int]) -> dict:
+    if not ids:
+        return {}
+    rows = db_session.execute(select_comments().where(Comment.id.in_(ids)))
+    return {row.id: row for row in rows}
+
+
+def compact_change_log(max_entries: int) -> tuple[int, int]:
+    """
+    Bound the change log: drop everything but the newest `max_entries`
+    entries, raising the horizon past them, then drop entries superseded
+    by a newer one for the same row. Returns both counts.
+
+    Collapsing never loses a change for any client: whatever `since` it
+    holds, the newest entry of every row changed after it is kept.
+    Truncation runs in short transactions so writers aren't held up.
+    """
+    with ENGINE.connect() as conn:
+        cutoff = conn.scalar(
+            select(ChangeLog.seq)
+            .order_by(ChangeLog.seq.desc())
+            .offset(max(max_entries, 1))
+            .limit(1)
+        )
+    truncated = 0
+    while cutoff is not None:
+        with ENGINE.begin() as conn:
+            oldest = conn.scalar(select(func.min(ChangeLog.seq)))
+            if oldest is None or oldest > cutoff:
+                break
+            upto = min(oldest + COMPACT_BATCH_SIZE - 1, cutoff)
+            truncated += conn.execute(
+                delete(ChangeLog).where(ChangeLog.seq <= upto)
+            ).rowcount
+            stmt = sqlite_insert(ChangeLogHorizon).values(id=1, seq=upto)
+            conn.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[ChangeLogHorizon.id],
+                    set_={"seq": stmt.excluded.seq},
+                )
+            )
+    with ENGINE.begin() as conn:
+        collapsed = conn.execute(
+            delete(ChangeLog).where(
+                ChangeLog.seq.not_in(
+                    select(func.max(ChangeLog.seq)).group_by(*_KEY)
+                )
+            )
+        ).rowcount
+    return truncated, collapsed
+
+
+def start_compactor() -> None:
+    """
+    Compact the change log every `change_log_compact_interval` seconds in
+    the background, once per process.
+    """
+    global _compactor_pid  # pylint: disable=global-statement
+    if _compactor_pid == os.getpid():
+        return
+    _compactor_pid = os.getpid()
+    threading.Thread(
+        target=_compact_forever, name="change-log-compact", daemon=True
+    ).start()
+
+
+def _compact_forever() -> None:
+    while True:
+        time.sleep(settings.change_log_compact_interval)
+        try:
+            started = time.perf_counter()
+            truncated, collapsed = compact_change_log(
+                settings.change_log_max_entries
+            )
+            if truncated or collapsed:
+                logger.info(
+                    "Compacted change log: %s truncated, %s collapsed "
+                    "in %.2fs",
+                    truncated,
+                    collapsed,
+                    time.perf_counter() - started,
+                )
+        except Exception as e:
+            logger.error("Change log compaction failed: %s", str(e))
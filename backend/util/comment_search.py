@@ -0,0 +1,111 @@
+import re
+
+from sqlalchemy import Float, Integer, Row, column, null, select, table
+
+from backend.db import read_rows
+from backend.helpers import decode_cursor, encode_cursor
+from backend.models import Comment, select_comments
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 200
+# Longer queries are cut down rather than rejected.
+SEARCH_MAX_TERMS = 16
+SEARCH_SORTS = ("rank", "recent")
+
+# The FTS5 index created in `backend.db`. `rowid` is the comment id and
+# `rank` its bm25 score (lower is a better match).
+COMMENTS_FTS = table(
+    "comments_fts",
+    column("rowid", Integer),
+    column("rank", Float),
+    column("comments_fts"),
+)
+
+# A trailing `*` asks for a prefix match.
+_TERM = re.compile(r"(\w+)(\*?)")
+
+
+def fts_query(text: str, item_id: str | None = None) -> str:
+    """
+    Turn free text into an FTS5 query: every word must match, in the comment
+    or the username. `word*` matches any word starting with `word`; prefixes
+    merge the postings of every matching word, so they cost more.
+
+    Words are quoted, so FTS5 operators and punctuation in `text` are never
+    interpreted. Raises ValueError when `text` has no words.
+    """
+    terms = _TERM.findall(text or "")[:SEARCH_MAX_TERMS]
+    if not terms:
+        raise ValueError("Missing search query")
+    phrases = [f'"{word}"{star}' for word, star in terms]
+    query = "{comment username} : (" + " ".join(phrases) + ")"
+    if item_id is not None:
+        # Item ids are indexed as single tokens, so scoping to an item is a
+        # doclist intersection inside the index rather than a join filter.
+        escaped = item_id.replace('"', '""')
+        query = f'item_id : "{escaped}" AND {query}'
+    return query
+
+
+def search_comments(
+    text: str,
+    limit: int,
+    cursor: str | None = None,
+    sort: str = "rank",
+    item_id: str | None = None,
+) -> tuple[list[Row], str | None]:
+    """
+    One page of comments matching `text`, best match first (`sort=rank`) or
+    newest first (`sort=recent`), with the cursor of the next page or None.
+
+    Ranking scores every match before the page is cut, so its cost grows
+    with the number of matching comments; `recent` walks the index in id
+    order and stops after one page. Raises ValueError for bad parameters.
+    """
+    if sort not in SEARCH_SORTS:
+        raise ValueError(f"sort must be one of: {', '.join(SEARCH_SORTS)}")
+    fts = COMMENTS_FTS
+    # The score is only computed when sorting by it.
+    score = fts.c.rank if sort == "rank" else null().label("rank")
+    matches = select(fts.c.rowid, score).where(
+        fts.c.comments_fts.match(fts_query(text, item_id))
+    )
+    values = decode_cursor(cursor) if cursor else None
+    if values is not None and len(values) != (2 if sort == "rank" else 1):
+        raise ValueError("Invalid cursor")
+    if sort == "rank":
+        if values is not None:
+            matches = matches.where(
+                (fts.c.rank > values[0])
+                | ((fts.c.rank == values[0]) & (fts.c.rowid > values[1]))
+            )
+        matches = matches.order_by(fts.c.rank, fts.c.rowid)
+    else:
+        if values is not None:
+            matches = matches.where(fts.c.rowid < values[0])
+        matches = matches.order_by(fts.c.rowid.desc())
+    # Only the page is joined back to `comments`, not every match.
+    page = matches.limit(limit + 1).subquery("matches")
+
+    rows = read_rows(
+        select_comments()
+        .add_columns(page.c.rank)
+        .join(page, Comment.id == page.c.rowid)
+        .order_by(
+            *(
+                (page.c.rank, page.c.rowid)
+                if sort == "rank"
+                else (page.c.rowid.desc(),)
+            )
+        )
+    ).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = (
+            encode_cursor(last.rank, last.id)
+            if sort == "rank"
+            else encode_cursor(last.id)
+        )
+    return rows, next_cursor
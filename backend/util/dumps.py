@@ -0,0 +1,109 @@
+from collections.abc import Callable, Sequence
+
+from flask import Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import Select, and_, or_
+
+from backend.db import read_rows
+from backend.helpers import decode_cursor, encode_cursor, parse_limit
+
+DUMP_PAGE_SIZE = 1000
+DUMP_MAX_PAGE_SIZE = 10000
+# Rows fetched from the SQLite cursor per round trip while streaming.
+STREAM_BATCH_SIZE = 1000
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+
+def _after(columns: Sequence, values: Sequence):
+    """
+    Keyset condition: the row sorts strictly after `values` on `columns`.
+    """
+    first, *rest = columns
+    if not rest:
+        return first > values[0]
+    return or_(
+        first > values[0],
+        and_(first == values[0], _after(rest, values[1:])),
+    )
+
+
+def dump_response(
+    stmt: Select, order_by: Sequence, serialize: Callable, key: str
+) -> Response:
+    """
+    Serve every row of `stmt`, in one of three shapes chosen by the query
+    string:
+
+    - default: a plain JSON array, built in memory;
+    - `limit` and/or `cursor`: one keyset page, `{key: [...], "nextCursor"}`
+      with `nextCursor` null on the last page;
+    - `stream=ndjson` or `stream=json`: the whole table as NDJSON or as a
+      JSON array, streamed from the cursor in constant memory.
+
+    `order_by` must be unique (e.g. the primary key) for pagination to be
+    exact. Raises ValueError for bad parameters.
+    """
+    stream = request.args.get("stream")
+    if stream is not None:
+        if stream not in STREAM_FORMATS:
+            raise ValueError(
+                f"stream must be one of: {', '.join(STREAM_FORMATS)}"
+            )
+        rows = read_rows(
+            stmt.order_by(*order_by).execution_options(
+                yield_per=STREAM_BATCH_SIZE
+            )
+        )
+        return Response(
+            stream_with_context(_stream(rows, serialize, stream)),
+            mimetype=STREAM_FORMATS[stream],
+        )
+
+    cursor = request.args.get("cursor")
+    if cursor is None and request.args.get("limit") is None:
+        # `all` fetches in one call rather than a row at a time.
+        rows = read_rows(stmt).all()
+        return jsonify([serialize(row) for row in rows])
+
+    limit = parse_limit(
+        request.args.get("limit"),
+        default=DUMP_PAGE_SIZE,
+        maximum=DUMP_MAX_PAGE_SIZE,
+    )
+    stmt = stmt.order_by(*order_by).limit(limit + 1)
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(order_by):
+            raise ValueError("Invalid cursor")
+        stmt = stmt.where(_after(order_by, values))
+    rows = read_rows(stmt).all()
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(
+            *(getattr(page[-1], column.key) for column in order_by)
+        )
+    return jsonify(
+        {key: [serialize(row) for row in page], "nextCursor": next_cursor}
+    )
+
+
+def _stream(rows, serialize: Callable, stream: str):
+    # One chunk per fetched batch rather than per row.
+    def dumps(row) -> str:
+        # Compact, like `jsonify` outside debug mode.
+        return current_app.json.dumps(serialize(row), separators=(",", ":"))
+
+    if stream == "ndjson":
+        for partition in rows.partitions():
+            yield "".join(dumps(row) + "\n" for row in partition)
+        return
+
+    yield "["
+    separator = ""
+    for partition in rows.partitions():
+        yield separator + ",".join(dumps(row) for row in partition)
+        separator = ","
+    yield "]"
@@ -0,0 +1,41 @@
+from flask import Response, request
+from sqlalchemy import select
+
+from backend.db import db_session
+from backend.models import ItemVersion
+
+
+def item_version(item_id: str) -> int:
+    version = db_session.scalar(
+        select(ItemVersion.version).where(ItemVersion.item_id == item_id)
+    )
+    return version or 0
+
+
+def item_etag(scope: str, item_id: str) -> str:
+    """
+    Strong ETag for a per-item representation.
+
+    Read the version *before* loading the rows it describes: a write landing
+    in between then yields a newer body under an older tag, which only costs
+    one extra 200 on the next request, never a stale 304.
+    """
+    return f"{scope}-{item_version(item_id)}"
+
+
+def not_modified(etag: str) -> Response | None:
+    """
+    A `304 Not Modified` response if the request's `If-None-Match` matches
+    `etag`, else None.
+    """
+    if not request.if_none_match.contains(etag):
+        return None
+    response = Response(status=304)
+    return with_etag(response, etag)
+
+
+def with_etag(response: Response, etag: str) -> Response:
+    response.set_etag(etag)
+    # Let clients keep the body but always revalidate it.
+    response.headers["Cache-Control"] = "no-cache"
+    return response
@@ -0,0 +1,86 @@
+import json
+import time
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from backend.db import db_session
+from backend.helpers import fetch_jellyfin_items
+from backend.models import ItemMetadata
+from backend.settings import settings
+
+
+def get_item_metadata(item_ids) -> dict[str, dict | None]:
+    """
+    Return Jellyfin `Name`, `Overview` and `ImageTags` for each item id.
+
+    Served from the `item_metadata` table while fresh. Stale or missing ids
+    are refreshed with batched `/Items` calls. If Jellyfin is unreachable,
+    stale entries are served as-is. Unknown items map to None.
+    """
+    item_ids = list(dict.fromkeys(item_ids))
+    if not item_ids:
+        return {}
+
+    cached = {
+        row.item_id: row
+        for row in db_session.scalars(
+            select(ItemMetadata).where(ItemMetadata.item_id.in_(item_ids))
+        )
+    }
+    fresh_after = time.time() - settings.item_metadata_ttl
+    refresh = [
+        item_id
+        for item_id in item_ids
+        if item_id not in cached or cached[item_id].fetched_at < fresh_after
+    ]
+
+    metadata = {item_id: _serialize(row) for item_id, row in cached.items()}
+    batch_size = settings.item_metadata_batch_size
+    for start in range(0, len(refresh), batch_size):
+        batch = refresh[start : start + batch_size]
+        items = fetch_jellyfin_items(batch)
+        if items is None:
+            continue
+        metadata.update(_store(batch, items))
+
+    return {item_id: metadata.get(item_id) for item_id in item_ids}
+
+
+def _store(item_ids: list[str], items: list[dict]) -> dict[str, dict | None]:
+    by_id = {item["Id"]: item for item in items if item.get("Id")}
+    now = time.time()
+    rows = [
+        {
+            "item_id": item_id,
+            "name": by_id.get(item_id, {}).get("Name"),
+            "overview": by_id.get(item_id, {}).get("Overview"),
+            "image_tags": json.dumps(by_id.get(item_id, {}).get("ImageTags")),
+            "fetched_at": now,
+        }
+        for item_id in item_ids
+    ]
+    stmt = sqlite_insert(ItemMetadata)
+    db_session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ItemMetadata.item_id],
+            set_={
+                "name": stmt.excluded.name,
+                "overview": stmt.excluded.overview,
+                "image_tags": stmt.excluded.image_tags,
+                "fetched_at": stmt.excluded.fetched_at,
+            },
+        ),
+        rows,
+    )
+    return {row["item_id"]: _serialize(ItemMetadata(**row)) for row in rows}
+
+
+def _serialize(row: ItemMetadata) -> dict | None:
+    if row.name is None:
+        return None
+    return {
+        "Name": row.name,
+        "Overview": row.overview,
+        "ImageTags": json.loads(row.image_tags) if row.image_tags else {},
+    }
@@ -0,0 +1,68 @@
+from typing import Any
+
+from flask import Flask, Response
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+from backend.logger import logger
+from backend.settings import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask's default provider with orjson doing the encoding and decoding,
+    several times faster on long lists.
+
+    Keys are sorted as with the default, and objects orjson doesn't handle
+    (dates included, so they keep Flask's HTTP date format) go through the
+    same `default` hook. Non-ASCII text is written as UTF-8 rather than
+    escaped. `dumps` output is always compact; options orjson can't honour
+    (e.g. `indent`) fall back to the standard library.
+    """
+
+    def _option(self) -> int:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs.keys() - {"separators"}:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(
+            obj, default=self.default, option=self._option()
+        ).decode()
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self._option() | orjson.OPT_APPEND_NEWLINE
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=option),
+            mimetype=self.mimetype,
+        )
+
+
+def json_provider(app: Flask) -> JSONProvider:
+    """
+    The JSON provider chosen by `settings.json_provider`: orjson when asked
+    for, or with "auto" when it's installed, Flask's default otherwise.
+    """
+    name = settings.json_provider
+    if name == "orjson" and orjson is None:
+        raise RuntimeError("JSON_PROVIDER=orjson but orjson isn't installed")
+    if name == "default" or orjson is None:
+        logger.debug("Using Flask's default JSON provider")
+        return DefaultJSONProvider(app)
+    logger.debug("Using the orjson JSON provider")
+    return OrjsonProvider(app)
@@ -0,0 +1,330 @@
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from pathlib import Path
+
+from flask import g, has_request_context
+from sqlalchemy import event
+
+from backend.db import ENGINE
+from backend.logger import logger
+from backend.settings import settings
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+# name -> (type, help, histogram buckets)
+METRICS: dict[str, tuple[str, str, tuple]] = {
+    "updoot_http_requests_total": (
+        "counter",
+        "HTTP requests by Flask endpoint, method and status.",
+        (),
+    ),
+    "updoot_http_request_duration_seconds": (
+        "histogram",
+        "HTTP request latency by Flask endpoint.",
+        LATENCY_BUCKETS,
+    ),
+    "updoot_db_queries_per_request": (
+        "histogram",
+        "SQL statements executed per HTTP request.",
+        QUERY_COUNT_BUCKETS,
+    ),
+    "updoot_db_time_per_request_seconds": (
+        "histogram",
+        "Time spent executing SQL per HTTP request.",
+        LATENCY_BUCKETS,
+    ),
+    "updoot_jellyfin_request_duration_seconds": (
+        "histogram",
+        "Jellyfin API call latency by path prefix and status.",
+        LATENCY_BUCKETS,
+    ),
+}
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms for one process.
+
+    Samples are keyed by (metric name, sorted label pairs). A histogram
+    sample is `[bucket counts..., +Inf count, sum]`, non-cumulative; the
+    cumulative form is only computed for exposition.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: dict[tuple[str, Labels], float] = {}
+        self.histograms: dict[tuple[str, Labels], list[float]] = {}
+
+    def inc(self, name: str, labels: dict[str, str], value=1.0) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe(self, name: str, labels: dict[str, str], value) -> None:
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            sample = self.histograms.get(key)
+            if sample is None:
+                sample = self.histograms[key] = [0.0] * (len(buckets) + 2)
+            sample[bisect_left(buckets, value)] += 1
+            sample[-1] += value
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def dump(self) -> dict:
+        with self._lock:
+            return {
+                "counters": [
+                    [name, list(labels), value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                "histograms": [
+                    [name, list(labels), sample]
+                    for (name, labels), sample in self.histograms.items()
+                ],
+            }
+
+    def merge(self, dumped: dict) -> None:
+        with self._lock:
+            for name, labels, value in dumped["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                self.counters[key] = self.counters.get(key, 0.0) + value
+            for name, labels, sample in dumped["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                merged = self.histograms.setdefault(key, [0.0] * len(sample))
+                for i, value in enumerate(sample):
+                    merged[i] += value
+
+
+registry = MetricsRegistry()
+
+
+def _metrics_dir() -> Path:
+    if settings.metrics_dir:
+        return Path(settings.metrics_dir)
+    return Path(settings.db_path).parent / "metrics"
+
+
+def _new_process_id() -> str:
+    # A pid alone could be reused by a later worker and overwrite the
+    # exited one's file, making counters go backwards.
+    return f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+_process_id = _new_process_id()
+
+
+def flush() -> None:
+    """
+    Write this process's metrics to `<metrics_dir>/<pid>-<nonce>.json`,
+    atomically.
+    """
+    directory = _metrics_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{_process_id}.json"
+    # Per-thread temp file: a scrape and the flusher may write at once.
+    tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(registry.dump()), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def collect() -> MetricsRegistry:
+    """
+    Sum the metrics of every worker process that has flushed since the
+    last `clear`, including exited ones so that counters never go
+    backwards.
+    """
+    flush()
+    total = MetricsRegistry()
+    for path in _metrics_dir().glob("*.json"):
+        try:
+            total.merge(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError) as e:
+            logger.warning("Skipping metrics file %s: %s", path, str(e))
+    return total
+
+
+def clear() -> None:
+    """
+    Delete every flushed metrics file. Run once before the workers start
+    (see start.sh), so earlier runs' processes aren't summed forever;
+    counters restart from zero like those of any restarted target.
+    """
+    directory = _metrics_dir()
+    for path in [*directory.glob("*.json"), *directory.glob("*.tmp")]:
+        path.unlink(missing_ok=True)
+
+
+def _format_labels(labels, **extra) -> str:
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+    escaped = (
+        (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def render_prometheus(metrics: MetricsRegistry) -> str:
+    """
+    Prometheus text exposition format (version 0.0.4).
+    """
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for (key, labels), value in sorted(metrics.counters.items()):
+                if key == name:
+                    lines.append(
+                        f"{name}{_format_labels(labels)} {_number(value)}"
+                    )
+            continue
+        for (key, labels), sample in sorted(metrics.histograms.items()):
+            if key != name:
+                continue
+            cumulative = 0.0
+            for bound, count in zip((*buckets, "+Inf"), sample[:-1]):
+                cumulative += count
+                le = bound if isinstance(bound, str) else f"{bound:g}"
+                lines.append(
+                    f"{name}_bucket{_format_labels(labels, le=le)} "
+                    f"{_number(cumulative)}"
+                )
+            lines.append(
+                f"{name}_sum{_format_labels(labels)} {_number(sample[-1])}"
+            )
+            lines.append(
+                f"{name}_count{_format_labels(labels)} {_number(cumulative)}"
+            )
+    return "\n".join(lines) + "\n"
+
+
+def start_request() -> None:
+    g.metrics_start = time.perf_counter()
+    g.metrics_queries = 0
+    g.metrics_query_time = 0.0
+
+
+def finish_request(endpoint: str | None, method: str, status: int) -> None:
+    if "metrics_start" not in g:
+        return
+    endpoint = endpoint or "unmatched"
+    registry.inc(
+        "updoot_http_requests_total",
+        {"endpoint": endpoint, "method": method, "status": str(status)},
+    )
+    registry.observe(
+        "updoot_http_request_duration_seconds",
+        {"endpoint": endpoint},
+        time.perf_counter() - g.metrics_start,
+    )
+    registry.observe(
+        "updoot_db_queries_per_request",
+        {"endpoint": endpoint},
+        g.metrics_queries,
+    )
+    registry.observe(
+        "updoot_db_time_per_request_seconds",
+        {"endpoint": endpoint},
+        g.metrics_query_time,
+    )
+
+
+def observe_jellyfin(path: str, status: str, seconds: float) -> None:
+    # Only the first path segment, so ids don't become labels.
+    prefix = "/" + path.strip("/").split("/", 1)[0]
+    registry.observe(
+        "updoot_jellyfin_request_duration_seconds",
+        {"path": prefix, "status": status},
+        seconds,
+    )
+
+
+@event.listens_for(ENGINE, "before_cursor_execute")
+def _start_query_timer(conn, _cursor, _statement, _params, _context, _many):
+    conn.info["metrics_query_start"] = time.perf_counter()
+
+
+@event.listens_for(ENGINE, "after_cursor_execute")
+def _stop_query_timer(conn, _cursor, _statement, _params, _context, _many):
+    started = conn.info.pop("metrics_query_start", None)
+    if (
+        started is not None
+        and has_request_context()
+        and "metrics_queries" in g
+    ):
+        g.metrics_queries += 1
+        g.metrics_query_time += time.perf_counter() - started
+
+
+_flush_pid: int | None = None
+
+
+def start_flusher() -> None:
+    """
+    Periodically flush this worker's metrics in the background, once per
+    process, so other workers' scrapes see them.
+    """
+    global _flush_pid  # pylint: disable=global-statement
+    if _flush_pid == os.getpid():
+        return
+    _flush_pid = os.getpid()
+    threading.Thread(
+        target=_flush_forever, name="metrics-flush", daemon=True
+    ).start()
+
+
+def _flush_forever() -> None:
+    while True:
+        time.sleep(settings.metrics_flush_interval)
+        try:
+            flush()
+        except OSError as e:
+            logger.warning("Error flushing metrics: %s", str(e))
+
+
+def _flush_at_exit() -> None:
+    if _flush_pid == os.getpid():
+        flush()
+
+
+def _after_fork_in_child() -> None:
+    # A forked child must not report the parent's samples as its own.
+    global _process_id  # pylint: disable=global-statement
+    _process_id = _new_process_id()
+    registry.reset()
+
+
+atexit.register(_flush_at_exit)
+os.register_at_fork(after_in_child=_after_fork_in_child)
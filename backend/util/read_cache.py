@@ -0,0 +1,109 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from flask import Response, current_app
+
+from backend.logger import logger
+from backend.settings import settings
+from backend.util.etags import item_etag, not_modified, with_etag
+
+
+class VersionedResponseCache:
+    """
+    Bounded LRU of serialized JSON bodies, each tagged with the ETag of the
+    item version it was built from.
+
+    An entry is only served while its tag matches the current row in
+    `item_versions`. That row is bumped by triggers in the writer's
+    transaction, so a write from any gunicorn worker invalidates every
+    worker's copy on its next read.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[Any, tuple[str, bytes]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Any, etag: str) -> bytes | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] != etag:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Any, etag: str, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[1])
+            self._data[key] = (etag, body)
+            self._bytes += len(body)
+            while (
+                len(self._data) > self.max_entries
+                or self._bytes > self.max_bytes
+            ):
+                _, (_, evicted) = self._data.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "maxEntries": self.max_entries,
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRatio": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+item_response_cache = VersionedResponseCache(
+    max_entries=settings.read_cache_max_entries,
+    max_bytes=settings.read_cache_max_bytes,
+)
+
+
+def cached_item_response(
+    scope: str, item_id: str, build: Callable[[], Any]
+) -> Response:
+    """
+    Serve a per-item JSON list, conditionally and from the read cache.
+
+    `build` loads and serializes the rows; it only runs when the client's
+    ETag is stale and this worker has no body for the current version.
+    """
+    etag = item_etag(scope, item_id)
+    if (response := not_modified(etag)) is not None:
+        return response
+
+    key = (scope, item_id)
+    body = item_response_cache.get(key, etag)
+    if body is None:
+        body = current_app.json.response(build()).get_data()
+        item_response_cache.put(key, etag, body)
+    else:
+        logger.debug("Read cache hit for %s item_id=%s", scope, item_id)
+
+    response = current_app.response_class(body, mimetype="application/json")
+    return with_etag(response, etag)
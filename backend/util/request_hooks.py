@@ -1,10 +1,40 @@
 from socket import error as socket_error
 
+from flask import g, request
 from sqlalchemy.exc import SQLAlchemyError
 
 from backend import APP
 from backend.db import db_session
+from backend.helpers import start_username_cache_warmup
 from backend.logger import logger
+from backend.util import metrics
+from backend.util.change_feed import start_compactor
+from backend.util.username_backfill import backfill_worker
+
+
+@APP.before_request
+def run_request_setup():
+    metrics.start_request()
+    # Background workers are per-process; these are no-ops once started.
+    start_username_cache_warmup()
+    backfill_worker.start()
+    metrics.start_flusher()
+    start_compactor()
+
+
+@APP.after_request
+def remember_response_status(response):
+    g.response_status = response.status_code
+    return response
+
+
+# Teardown functions run in reverse order of registration, so this one runs
+# after run_request_teardown and also times the commit.
+@APP.teardown_request
+def record_request_metrics(_exception=None):
+    metrics.finish_request(
+        request.endpoint, request.method, g.get("response_status", 500)
+    )
 
 
 @APP.teardown_request
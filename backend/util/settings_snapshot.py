@@ -0,0 +1,98 @@
+import threading
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import event, select
+
+from backend.db import db_session
+from backend.models import Setting, SettingsVersion, UserSetting
+from backend.settings import settings
+
+_CHANGED_KEY = "settings_changed"
+
+
+@dataclass(frozen=True)
+class LimitSettings:
+    version: int
+    global_limit: int = 0
+    user_limits: dict[str, int] = field(default_factory=dict)
+
+    def user_limit(self, user_id: str) -> int:
+        return self.user_limits.get(user_id) or 0
+
+
+class SettingsSnapshot:
+    """
+    Per-worker copy of the recommendation limits.
+
+    The copy is trusted for `max_age` seconds, then revalidated against the
+    trigger-maintained `settings_version` row and reloaded only if that
+    changed, so a save from any gunicorn worker is picked up everywhere
+    within `max_age`. Saves in this worker invalidate it on commit.
+    """
+
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._snapshot: LimitSettings | None = None
+        self._checked_at = 0.0
+
+    def get(self) -> LimitSettings:
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and now - self._checked_at < self.max_age:
+            return snapshot
+
+        with self._lock:
+            version = _settings_version()
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                # Rows loaded after the version read can only be newer than
+                # it, which just costs one more reload later.
+                snapshot = _load(version)
+                self._snapshot = snapshot
+            self._checked_at = now
+            return snapshot
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshot = None
+
+
+def _settings_version() -> int:
+    version = db_session.scalar(
+        select(SettingsVersion.version).where(SettingsVersion.id == 1)
+    )
+    return version or 0
+
+
+def _load(version: int) -> LimitSettings:
+    global_limit = db_session.scalars(select(Setting.global_limit)).first()
+    user_limits = {
+        user_id: user_limit or 0
+        for user_id, user_limit in db_session.execute(
+            select(UserSetting.user_id, UserSetting.user_limit)
+        )
+    }
+    return LimitSettings(version, global_limit or 0, user_limits)
+
+
+settings_snapshot = SettingsSnapshot(settings.settings_snapshot_max_age)
+
+
+def mark_settings_changed() -> None:
+    """
+    Drop this worker's snapshot once the current transaction commits.
+    """
+    db_session.info[_CHANGED_KEY] = True
+
+
+@event.listens_for(db_session, "after_commit")
+def _invalidate_changed_settings(session):
+    if session.info.pop(_CHANGED_KEY, False):
+        settings_snapshot.invalidate()
+
+
+@event.listens_for(db_session, "after_rollback")
+def _discard_changed_settings(session):
+    session.info.pop(_CHANGED_KEY, None)
@@ -0,0 +1,95 @@
+import gzip
+import hashlib
+import threading
+from pathlib import Path
+
+from flask import Request, Response
+
+from backend.logger import logger
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+# Preferred first when the client accepts several with the same quality.
+ENCODINGS = ("br", "gzip", "identity")
+
+
+class PrecompressedAsset:
+    """
+    A static file kept in memory together with gzip (and, if a brotli module
+    is installed, brotli) encoded copies, compressed once per load.
+
+    `response` negotiates the encoding from `Accept-Encoding` and answers
+    `If-None-Match` with a 304. With `check_mtime`, the file is reloaded
+    when it changes on disk, so edits show up under `flask run --debug`.
+    """
+
+    def __init__(self, path: Path, content_type: str, cache_control: str):
+        self.path = path
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self._lock = threading.Lock()
+        # (mtime_ns, etag, {encoding: body}), swapped as a whole.
+        self._loaded: tuple[int, str, dict[str, bytes]] | None = None
+
+    def load(self) -> None:
+        with self._lock:
+            mtime = self.path.stat().st_mtime_ns
+            body = self.path.read_bytes()
+            variants = {
+                "identity": body,
+                "gzip": gzip.compress(body, compresslevel=9, mtime=0),
+            }
+            if brotli is not None:
+                variants["br"] = brotli.compress(body, quality=11)
+            etag = hashlib.sha256(body).hexdigest()[:32]
+            self._loaded = (mtime, etag, variants)
+        logger.info(
+            "Loaded %s: %s",
+            self.path,
+            ", ".join(f"{enc}={len(b)}B" for enc, b in variants.items()),
+        )
+
+    def _current(self, check_mtime: bool):
+        loaded = self._loaded
+        if loaded is None or (
+            check_mtime and self.path.stat().st_mtime_ns != loaded[0]
+        ):
+            self.load()
+            loaded = self._loaded
+        return loaded
+
+    def response(self, request: Request, check_mtime: bool = False):
+        """
+        Build the response for `request`. Raises FileNotFoundError if the
+        file was never loaded and doesn't exist.
+        """
+        _, digest, variants = self._current(check_mtime)
+        encoding = max(
+            (enc for enc in ENCODINGS if enc in variants),
+            key=lambda enc: (
+                request.accept_encodings.quality(enc)
+                or (1 if enc == "identity" else 0),
+                -ENCODINGS.index(enc),
+            ),
+        )
+        # Strong ETags must differ per encoding of the same content.
+        etag = digest if encoding == "identity" else f"{digest}-{encoding}"
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(
+                variants[encoding], content_type=self.content_type
+            )
+            if encoding != "identity":
+                response.headers["Content-Encoding"] = encoding
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = self.cache_control
+        response.vary.add("Accept-Encoding")
+        return response
@@ -0,0 +1,248 @@
+import os
+import queue
+import threading
+import time
+
+from sqlalchemy import event, exists, select, union
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from backend.db import ENGINE, db_session
+from backend.helpers import fallback_username, username_resolver
+from backend.logger import logger
+from backend.models import Comment, Recommendation, User
+from backend.settings import settings
+
+_PENDING_KEY = "pending_username_backfill"
+_USER_TABLES = (Recommendation.__table__, Comment.__table__)
+
+
+def _needs_backfill(user_id: str) -> bool:
+    # A cached name alone isn't enough: warming the cache writes no rows.
+    # Users Jellyfin recently didn't know are left to the next sweep.
+    if user_id in backfill_worker.stored:
+        return False
+    return username_resolver.peek(user_id) != fallback_username(user_id)
+
+
+def schedule_username_backfill(user_id: str) -> None:
+    """
+    Queue `user_id` for backfill once the current transaction commits,
+    unless this process has seen its `users` row.
+
+    Writes never store a name; until `users` has a row for the user, reads
+    show the provisional `User_xxxxxxxx`. A name already in the username
+    cache is written without calling Jellyfin.
+    """
+    if _needs_backfill(user_id):
+        db_session.info.setdefault(_PENDING_KEY, set()).add(user_id)
+
+
+def queue_username_backfill(user_ids) -> None:
+    """
+    Like `schedule_username_backfill`, for writes committed outside
+    `db_session` (see backend.util.write_queue).
+    """
+    missing = [u for u in user_ids if _needs_backfill(u)]
+    if missing:
+        backfill_worker.enqueue(missing)
+
+
+def refresh_usernames() -> int | None:
+    """
+    Bring `users` in line with Jellyfin's full `/Users` list, fetched in
+    one call. Only rows whose name changed (or was never confirmed) are
+    written, so a rename is a one-row update.
+
+    Returns the number of rows written, or None if Jellyfin couldn't be
+    reached.
+    """
+    names = username_resolver.fetch_all()
+    if names is None:
+        return None
+    with ENGINE.connect() as conn:
+        current = {
+            row.user_id: row
+            for row in conn.execute(
+                select(User.user_id, User.name, User.refreshed_at)
+            )
+        }
+    now = time.time()
+    changed = [
+        {"user_id": user_id, "name": name, "refreshed_at": now}
+        for user_id, name in names.items()
+        if user_id not in current
+        or current[user_id].name != name
+        or current[user_id].refreshed_at is None
+    ]
+    if changed:
+        stmt = sqlite_insert(User)
+        with ENGINE.begin() as conn:
+            conn.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[User.user_id],
+                    set_={
+                        "name": stmt.excluded.name,
+                        "refreshed_at": stmt.excluded.refreshed_at,
+                    },
+                ),
+                changed,
+            )
+    backfill_worker.stored.update(current)
+    backfill_worker.stored.update(names)
+    logger.info(
+        "Refreshed usernames: %s of %s users written",
+        len(changed),
+        len(names),
+    )
+    return len(changed)
+
+
+class UsernameBackfillWorker:
+    """
+    Background thread that fills in `users`, keeping Jellyfin off the write
+    path. Users written without a known name are resolved in batches.
+
+    `start` is keyed on the pid so each gunicorn worker runs its own thread
+    after fork. A periodic sweep refreshes every name from `/Users` and then
+    picks up anyone still missing, e.g. users written while Jellyfin was
+    down or no longer listed there.
+    """
+
+    def __init__(self, batch_size: int, delay: float, sweep_interval: float):
+        self.batch_size = batch_size
+        self.delay = delay
+        self.sweep_interval = sweep_interval
+        self._queue: queue.SimpleQueue[str] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+        # Users seen in `users` by this process. The app never deletes those
+        # rows, so these never need a backfill.
+        self.stored: set[str] = set()
+
+    def enqueue(self, user_ids) -> None:
+        self.start()
+        for user_id in user_ids:
+            self._queue.put(user_id)
+
+    def start(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.SimpleQueue()
+            threading.Thread(
+                target=self._run, name="username-backfill", daemon=True
+            ).start()
+            self._pid = os.getpid()
+
+    def _run(self) -> None:
+        next_sweep = time.monotonic()
+        while True:
+            if time.monotonic() >= next_sweep:
+                self._safe(self.sweep)
+                next_sweep = time.monotonic() + self.sweep_interval
+
+            try:
+                first = self._queue.get(
+                    timeout=max(next_sweep - time.monotonic(), 0)
+                )
+            except queue.Empty:
+                continue
+
+            # Give concurrent writes a moment to land so they share a batch.
+            time.sleep(self.delay)
+            user_ids = {first}
+            while len(user_ids) < self.batch_size:
+                try:
+                    user_ids.add(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._safe(self.backfill, user_ids)
+
+    @staticmethod
+    def _safe(fn, *args) -> None:
+        try:
+            fn(*args)
+        except Exception as e:
+            logger.error("Username backfill failed: %s", str(e))
+
+    def sweep(self) -> None:
+        """
+        Refresh every name, then queue the users that still have no row.
+        """
+        refresh_usernames()
+        missing = union(
+            *(
+                select(table.c.user_id).where(
+                    table.c.user_id.is_not(None),
+                    ~exists().where(User.user_id == table.c.user_id),
+                )
+                for table in _USER_TABLES
+            )
+        )
+        with ENGINE.connect() as conn:
+            user_ids = conn.scalars(missing).all()
+        if user_ids:
+            logger.info(
+                "Queueing username backfill for %s users", len(user_ids)
+            )
+            for user_id in user_ids:
+                self._queue.put(user_id)
+
+    def backfill(self, user_ids) -> None:
+        with ENGINE.connect() as conn:
+            known = set(
+                conn.scalars(
+                    select(User.user_id).where(User.user_id.in_(user_ids))
+                )
+            )
+        self.stored.update(known)
+        missing = [u for u in user_ids if u not in known]
+        unknown = [u for u in missing if username_resolver.peek(u) is None]
+        if len(unknown) > 1:
+            # One /Users call is cheaper than a lookup per user.
+            username_resolver.warm()
+
+        rows = []
+        for user_id in missing:
+            username = username_resolver.resolve(user_id)
+            if username != fallback_username(user_id):
+                rows.append(
+                    {
+                        "user_id": user_id,
+                        "name": username,
+                        "refreshed_at": time.time(),
+                    }
+                )
+        if not rows:
+            return
+
+        with ENGINE.begin() as conn:
+            conn.execute(
+                sqlite_insert(User).on_conflict_do_nothing(
+                    index_elements=[User.user_id]
+                ),
+                rows,
+            )
+        self.stored.update(row["user_id"] for row in rows)
+        logger.debug("Backfilled usernames for %s users", len(rows))
+
+
+backfill_worker = UsernameBackfillWorker(
+    batch_size=settings.username_backfill_batch_size,
+    delay=settings.username_backfill_delay,
+    sweep_interval=settings.username_backfill_sweep_interval,
+)
+
+
+@event.listens_for(db_session, "after_commit")
+def _enqueue_pending_backfill(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        backfill_worker.enqueue(pending)
+
+
+@event.listens_for(db_session, "after_rollback")
+def _discard_pending_backfill(session):
+    session.info.pop(_PENDING_KEY, None)
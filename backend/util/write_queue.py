@@ -0,0 +1,298 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+from sqlalchemy import Connection, delete, func, insert, select, tuple_
+
+from backend.db import ENGINE
+from backend.logger import logger
+from backend.models import (
+    GLOBAL_COUNTER_KEY,
+    Comment,
+    Recommendation,
+    RecommendationCounter,
+)
+from backend.settings import settings
+from backend.util.settings_snapshot import LimitSettings
+from backend.util.username_backfill import queue_username_backfill
+
+# Seconds a request waits for its batch to commit before giving up.
+ACK_TIMEOUT = 30.0
+# Seconds the writer waits before reconnecting after an error.
+RECONNECT_DELAY = 1.0
+
+
+@dataclass(frozen=True)
+class ToggleResult:
+    # "recommended" or "unrecommended"; None when a limit was reached.
+    status: str | None
+    # Recommendations of the item once the toggle is applied.
+    count: int = 0
+    error: str | None = None
+
+
+@dataclass(frozen=True)
+class _Toggle:
+    user_id: str
+    item_id: str
+    limits: LimitSettings
+
+
+@dataclass(frozen=True)
+class _NewComment:
+    user_id: str
+    item_id: str
+    comment: str
+
+
+class WriteQueue:
+    """
+    Write-behind path for recommendation toggles and new comments: request
+    threads hand them to one writer thread per process, which applies them
+    in batched transactions, so one commit covers many requests.
+
+    A batch closes after `max_batch` writes or `max_delay` seconds after its
+    first one. Toggles are replayed in queue order against the rows and
+    counters read at the start of the transaction, so every caller gets the
+    answer it would have got alone; repeated toggles of a pair collapse into
+    at most one INSERT or DELETE. Callers block until their batch commits,
+    and the writer commits with `synchronous=FULL` whatever the engine
+    profile says, so an acknowledged write survives a power loss.
+
+    Batches form from concurrent requests of the same process, so this only
+    pays off with threaded workers. `start` is keyed on the pid, like the
+    username backfill worker, and restarts the writer if it ever exits.
+    """
+
+    def __init__(self, max_batch: int, max_delay: float):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: queue.SimpleQueue[tuple[object, Future]] = (
+            queue.SimpleQueue()
+        )
+        self._lock = threading.Lock()
+        # Pid of the process whose writer is running, and of the process
+        # that owns `_queue` (a forked child must not reuse its parent's).
+        self._pid: int | None = None
+        self._queue_pid: int | None = None
+
+    def toggle_recommendation(
+        self, user_id: str, item_id: str, limits: LimitSettings
+    ) -> ToggleResult:
+        return self._submit(_Toggle(user_id, item_id, limits))
+
+    def add_comment(self, user_id: str, item_id: str, comment: str) -> None:
+        self._submit(_NewComment(user_id, item_id, comment))
+
+    def _submit(self, operation):
+        self.start()
+        future: Future = Future()
+        self._queue.put((operation, future))
+        return future.result(timeout=ACK_TIMEOUT)
+
+    def start(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._queue_pid != os.getpid():
+                self._queue = queue.SimpleQueue()
+                self._queue_pid = os.getpid()
+            threading.Thread(
+                target=self._run, name="write-queue", daemon=True
+            ).start()
+            self._pid = os.getpid()
+
+    def _run(self) -> None:
+        try:
+            while True:
+                try:
+                    self._serve()
+                except Exception as e:
+                    logger.error(
+                        "Write queue failed, reconnecting: %s", str(e)
+                    )
+                    time.sleep(RECONNECT_DELAY)
+        finally:
+            # Let the next `start` bring up a new writer.
+            with self._lock:
+                self._pid = None
+
+    def _serve(self) -> None:
+        # A connection of its own: request threads waiting for their batch
+        # may hold every pooled one.
+        with ENGINE.connect() as conn:
+            try:
+                synchronous = (
+                    "EXTRA"
+                    if settings.sqlite_synchronous == "EXTRA"
+                    else "FULL"
+                )
+                conn.exec_driver_sql(f"PRAGMA synchronous = {synchronous}")
+                conn.commit()
+                while True:
+                    self._write_batch(conn)
+            except Exception:
+                # Neither a broken connection nor one left on FULL goes back
+                # to the pool.
+                conn.invalidate()
+                raise
+
+    def _write_batch(self, conn: Connection) -> None:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(
+                    self._queue.get(
+                        timeout=max(deadline - time.monotonic(), 0)
+                    )
+                )
+            except queue.Empty:
+                break
+        operations = [operation for operation, _ in batch]
+        try:
+            results = self.write(conn, operations)
+        except Exception as e:
+            logger.error("Write batch of %s failed: %s", len(batch), str(e))
+            for _, future in batch:
+                future.set_exception(e)
+            raise
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+        queue_username_backfill({op.user_id for op in operations})
+
+    def write(self, conn: Connection, operations: list) -> list:
+        """
+        Apply `operations` in one transaction; returns their results in
+        order (a ToggleResult per toggle, None per comment).
+        """
+        toggles = [op for op in operations if isinstance(op, _Toggle)]
+        comments = [op for op in operations if isinstance(op, _NewComment)]
+        with conn.begin():
+            # Take the write lock before reading, so the rows and counters
+            # the toggles are replayed against can't change underneath.
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            toggled = iter(_apply_toggles(conn, toggles) if toggles else [])
+            if comments:
+                conn.execute(
+                    insert(Comment),
+                    [
+                        {
+                            "user_id": op.user_id,
+                            "item_id": op.item_id,
+                            "comment": op.comment,
+                        }
+                        for op in comments
+                    ],
+                )
+        logger.debug(
+            "Committed write batch: %s toggles, %s comments",
+            len(toggles),
+            len(comments),
+        )
+        return [
+            next(toggled) if isinstance(op, _Toggle) else None
+            for op in operations
+        ]
+
+
+def _apply_toggles(
+    conn: Connection, toggles: list[_Toggle]
+) -> list[ToggleResult]:
+    pairs = {(op.user_id, op.item_id) for op in toggles}
+    existing = {
+        (row.user_id, row.item_id)
+        for row in conn.execute(
+            select(Recommendation.user_id, Recommendation.item_id).where(
+                tuple_(Recommendation.user_id, Recommendation.item_id).in_(
+                    pairs
+                )
+            )
+        )
+    }
+    totals = dict(
+        conn.execute(
+            select(
+                RecommendationCounter.user_id, RecommendationCounter.total
+            ).where(
+                RecommendationCounter.user_id.in_(
+                    {GLOBAL_COUNTER_KEY, *(op.user_id for op in toggles)}
+                )
+            )
+        ).all()
+    )
+    counts = dict(
+        conn.execute(
+            select(Recommendation.item_id, func.count())
+            .where(Recommendation.item_id.in_({op.item_id for op in toggles}))
+            .group_by(Recommendation.item_id)
+        ).all()
+    )
+
+    present = set(existing)
+    results = []
+    for op in toggles:
+        pair = (op.user_id, op.item_id)
+        if pair in present:
+            present.remove(pair)
+            status, delta = "unrecommended", -1
+        else:
+            error = _limit_error(op, totals)
+            if error:
+                results.append(
+                    ToggleResult(None, counts.get(op.item_id, 0), error)
+                )
+                continue
+            present.add(pair)
+            status, delta = "recommended", 1
+        for key in (GLOBAL_COUNTER_KEY, op.user_id):
+            totals[key] = totals.get(key, 0) + delta
+        counts[op.item_id] = counts.get(op.item_id, 0) + delta
+        results.append(ToggleResult(status, counts[op.item_id]))
+
+    removed = existing - present
+    if removed:
+        conn.execute(
+            delete(Recommendation).where(
+                tuple_(Recommendation.user_id, Recommendation.item_id).in_(
+                    removed
+                )
+            )
+        )
+    added = present - existing
+    if added:
+        conn.execute(
+            insert(Recommendation),
+            [
+                {"user_id": user_id, "item_id": item_id}
+                for user_id, item_id in sorted(added)
+            ],
+        )
+    return results
+
+
+def _limit_error(op: _Toggle, totals: dict[str, int]) -> str | None:
+    # Same checks and messages as the per-request toggle.
+    global_limit = op.limits.global_limit
+    if 0 < global_limit <= totals.get(GLOBAL_COUNTER_KEY, 0):
+        logger.warning(
+            "Global recommendation limit reached: %s/%s",
+            totals.get(GLOBAL_COUNTER_KEY, 0),
+            global_limit,
+        )
+        return "Global recommendation limit reached"
+    if 0 < op.limits.user_limit(op.user_id) <= totals.get(op.user_id, 0):
+        logger.warning("User %s recommendation limit reached", op.user_id)
+        return "User recommendation limit reached"
+    return None
+
+
+write_queue = WriteQueue(
+    max_batch=settings.write_queue_max_batch,
+    max_delay=settings.write_queue_max_delay,
+)
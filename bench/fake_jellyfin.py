@@ -0,0 +1,123 @@
+"""
+Stub Jellyfin server answering the API calls the backend makes, with
+configurable latency.
+
+    python -m bench.fake_jellyfin [--port 18096] [--latency-ms 20]
+
+Serves `/Users`, `/Users/{id}` and `/Items?Ids=...`. Users are the ones
+`bench.seed` generates for the same `--users` and `--seed`. Any other user
+id is a 404. Every requested item id exists, except for `missing_items`.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from bench.seed import USERS, user_ids, username
+
+
+class FakeJellyfin(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        users: list[str],
+        latency: float = 0.0,
+        jitter: float = 0.0,
+    ):
+        super().__init__(address, _Handler)
+        self.users = {user_id: username(user_id) for user_id in users}
+        self.latency = latency
+        self.jitter = jitter
+        # Item ids answered as absent from the library.
+        self.missing_items: set[str] = set()
+        # Path and query of every request served, oldest first.
+        self.requests: list[str] = []
+
+    def delay(self) -> None:
+        pause = self.latency + random.uniform(0, self.jitter)
+        if pause > 0:
+            time.sleep(pause)
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(
+            target=self.serve_forever, name="fake-jellyfin", daemon=True
+        )
+        thread.start()
+        return thread
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeJellyfin
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.server.delay()
+        self.server.requests.append(self.path)
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        users = self.server.users
+
+        if parts == ["Users"]:
+            body = [{"Id": uid, "Name": name} for uid, name in users.items()]
+        elif len(parts) == 2 and parts[0] == "Users" and parts[1] in users:
+            body = {"Id": parts[1], "Name": users[parts[1]]}
+        elif parts == ["Items"]:
+            ids = parse_qs(url.query).get("Ids", [""])[0].split(",")
+            items = [
+                {
+                    "Id": item_id,
+                    "Name": f"Item {item_id[:8]}",
+                    "Overview": f"Overview of item {item_id}.",
+                    "ImageTags": {"Primary": item_id[:16]},
+                }
+                for item_id in ids
+                if item_id and item_id not in self.server.missing_items
+            ]
+            body = {"Items": items, "TotalRecordCount": len(items)}
+        else:
+            self.send_error(404)
+            return
+
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18096)
+    parser.add_argument("--users", type=int, default=USERS)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeJellyfin(
+        (args.host, args.port),
+        user_ids(args.users, args.seed),
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+    )
+    print(f"Fake Jellyfin listening on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Compare TEXT and 16-byte BLOB (`COMPACT_IDS`) storage of Jellyfin ids.
+
+Makes two vacuumed copies of a database seeded by `bench.seed`, one
+converted to BLOB ids by `init_db` with COMPACT_IDS=1, and reports for
+each: file and table/index sizes, and the latency and SQLite page cache hit
+rate of the per-item reads the app serves.
+
+    python -m bench.id_storage data/bench.db [--queries 5000]
+
+Reads run with memory-mapped I/O off and a page cache of `--cache-kib`
+(default: the app's 16 MiB), so every page comes through the cache. Hit
+rates are read with `sqlite3_db_status`, which needs CPython's sqlite3
+module; they are left out where the handle can't be found.
+"""
+
+import argparse
+import ctypes
+import os
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import _sqlite3
+
+PROJECT_ROOT = str(Path(__file__).resolve().parents[1])
+
+QUERIES = {
+    "recommendations for item": (
+        "SELECT r.user_id, r.item_id, u.name FROM recommendations r "
+        "LEFT JOIN users u USING (user_id) WHERE r.item_id = :item_id"
+    ),
+    "comments for item": (
+        "SELECT c.id, c.user_id, c.item_id, u.name, c.comment "
+        "FROM comments c LEFT JOIN users u USING (user_id) "
+        "WHERE c.item_id = :item_id"
+    ),
+    "recommendation count": (
+        "SELECT count(*) FROM recommendations WHERE item_id = :item_id"
+    ),
+    "toggle lookup": (
+        "SELECT 1 FROM recommendations "
+        "WHERE user_id = :user_id AND item_id = :item_id"
+    ),
+}
+SIZED = (
+    "recommendations",
+    "sqlite_autoindex_recommendations_1",
+    "ix_recommendations_item_id_user_id",
+    "comments",
+    "ix_comments_item_id_id",
+    "ix_comments_user_id",
+    "users",
+    "change_log",
+    "ix_change_log_item_id_seq",
+)
+
+_CACHE_HIT = 7
+_CACHE_MISS = 8
+
+
+class _PageCacheStats:
+    """
+    Page cache hit/miss counters of a sqlite3 connection, or None values
+    when the `sqlite3 *` handle can't be located.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, path: str):
+        self._lib = ctypes.CDLL(_sqlite3.__file__)
+        self._lib.sqlite3_db_status.argtypes = [
+            ctypes.c_void_p,
+            ctypes.c_int,
+            ctypes.POINTER(ctypes.c_int),
+            ctypes.POINTER(ctypes.c_int),
+            ctypes.c_int,
+        ]
+        self._lib.sqlite3_db_filename.argtypes = [
+            ctypes.c_void_p,
+            ctypes.c_char_p,
+        ]
+        self._lib.sqlite3_db_filename.restype = ctypes.c_char_p
+        # pysqlite's connection struct starts with the handle.
+        handle = ctypes.c_void_p.from_address(
+            id(conn) + object.__basicsize__
+        ).value
+        filename = self._lib.sqlite3_db_filename(handle, b"main")
+        same = filename and os.path.samefile(filename.decode(), path)
+        self._handle = handle if same else None
+
+    def read(self, reset: bool = False) -> tuple[int, int] | None:
+        if self._handle is None:
+            return None
+        counts = []
+        for op in (_CACHE_HIT, _CACHE_MISS):
+            current, highwater = ctypes.c_int(), ctypes.c_int()
+            self._lib.sqlite3_db_status(
+                self._handle,
+                op,
+                ctypes.byref(current),
+                ctypes.byref(highwater),
+                int(reset),
+            )
+            counts.append(current.value)
+        return counts[0], counts[1]
+
+
+def _copy(source: str, target: str, compact: bool) -> None:
+    # Both copies are migrated, so they only differ in id storage.
+    shutil.copy(source, target)
+    env = {
+        **os.environ,
+        "DB_PATH": target,
+        "COMPACT_IDS": "1" if compact else "0",
+        "JELLYFIN_URL": "http://127.0.0.1:9",
+        "JELLYFIN_API_KEY": "bench",
+        "LOG_FILE": "",
+        "LOG_LEVEL": "WARNING",
+    }
+    subprocess.run(
+        [sys.executable, "-c", "from backend.db import init_db; init_db()"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        check=True,
+    )
+    if not compact:
+        # Converting to BLOBs vacuums; do the same for a fair comparison.
+        conn = sqlite3.connect(target)
+        conn.execute("VACUUM")
+        conn.close()
+
+
+def _sample(db_path: str, size: int) -> list[dict]:
+    # Rows drawn uniformly, so items come up as often as they're popular.
+    conn = sqlite3.connect(db_path)
+    try:
+        return [
+            {"user_id": user_id, "item_id": item_id}
+            for user_id, item_id in conn.execute(
+                "SELECT user_id, item_id FROM recommendations "
+                "ORDER BY random() LIMIT ?",
+                (size,),
+            )
+        ]
+    finally:
+        conn.close()
+
+
+def measure(
+    db_path: str, sample: list[dict], compact: bool, cache_kib: int
+) -> dict:
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"PRAGMA cache_size = {-cache_kib}")
+    conn.execute("PRAGMA mmap_size = 0")
+    stats = _PageCacheStats(conn, db_path)
+    if compact:
+        sample = [
+            {key: bytes.fromhex(value) for key, value in params.items()}
+            for params in sample
+        ]
+
+    result = {"file": os.path.getsize(db_path)}
+    result.update(
+        conn.execute(
+            "SELECT name, sum(pgsize) FROM dbstat "
+            f"WHERE name IN ({','.join('?' * len(SIZED))}) GROUP BY name",
+            SIZED,
+        ).fetchall()
+    )
+    half = len(sample) // 2
+    for name, sql in QUERIES.items():
+        # The first half warms the cache, the second is measured.
+        for params in sample[:half]:
+            conn.execute(sql, params).fetchall()
+        stats.read(reset=True)
+        timings = []
+        for params in sample[half:]:
+            started = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            timings.append(time.perf_counter() - started)
+        counts = stats.read()
+        timings.sort()
+        result[name] = {
+            "p50": statistics.median(timings),
+            "p99": timings[int(len(timings) * 0.99)],
+            "hit_rate": (counts[0] / (sum(counts) or 1)) if counts else None,
+        }
+    conn.close()
+    return result
+
+
+def _size(value: int) -> str:
+    return f"{value / 2**20:.1f} MiB"
+
+
+def _report(text: dict, blob: dict) -> None:
+    print(f"{'':40} {'TEXT':>12} {'BLOB':>12} {'change':>8}")
+    for name in ("file", *SIZED):
+        if name not in text:
+            continue
+        change = blob[name] / text[name] - 1
+        print(
+            f"{name:40} {_size(text[name]):>12} {_size(blob[name]):>12} "
+            f"{change:>+8.0%}"
+        )
+    for name in QUERIES:
+        for metric in ("p50", "p99"):
+            print(
+                f"{name + ' ' + metric:40} "
+                f"{text[name][metric] * 1e6:>10.1f}us "
+                f"{blob[name][metric] * 1e6:>10.1f}us "
+                f"{blob[name][metric] / text[name][metric] - 1:>+8.0%}"
+            )
+        if text[name]["hit_rate"] is not None:
+            print(
+                f"{name + ' cache hits':40} "
+                f"{text[name]['hit_rate']:>12.1%} "
+                f"{blob[name]['hit_rate']:>12.1%}"
+            )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("db_path", help="database seeded with TEXT ids")
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--cache-kib", type=int, default=16384)
+    args = parser.parse_args()
+
+    sample = _sample(args.db_path, args.queries)
+    if sample and isinstance(sample[0]["user_id"], bytes):
+        print(f"{args.db_path} already has BLOB ids", file=sys.stderr)
+        return 1
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for name, compact in (("text", False), ("blob", True)):
+            path = os.path.join(tmp, f"{name}.db")
+            started = time.perf_counter()
+            _copy(args.db_path, path, compact)
+            print(
+                f"Prepared {name} copy in {time.perf_counter() - started:.1f}s"
+            )
+            results[name] = measure(path, sample, compact, args.cache_kib)
+    _report(results["text"], results["blob"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
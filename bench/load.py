@@ -0,0 +1,482 @@
+"""
+HTTP load driver: latency percentiles and throughput for every endpoint.
+
+Copies a database seeded by `bench.seed`, starts `bench.fake_jellyfin` and
+the app (gunicorn by default) against the copy, then runs `--requests`
+requests per endpoint from `--concurrency` threads. Results are written as
+JSON for comparison across commits:
+
+    python -m bench.seed data/bench.db
+    python -m bench.load data/bench.db [--output bench-results.json]
+    python -m bench.load data/bench.db --baseline bench-results.json
+
+Without a database argument, a small one is seeded first (`--scale`).
+"""
+
+import argparse
+import importlib.util
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+import requests
+
+from bench.fake_jellyfin import FakeJellyfin
+from bench.seed import WORDS, seed
+
+PROJECT_ROOT = str(Path(__file__).resolve().parents[1])
+ROOT_PATH = "/updoot"
+SAMPLE_SIZE = 5000
+
+Request = tuple[str, str, dict]
+
+
+def _hex(value):
+    # Ids are BLOBs in databases seeded with COMPACT_IDS.
+    return value.hex() if isinstance(value, bytes) else value
+
+
+@dataclass
+class Sample:
+    """
+    Ids drawn from the seeded database to build requests with.
+    """
+
+    users: list[str]
+    items: list[str]
+    # (comment id, author user id)
+    comments: list[tuple[int, str]]
+
+    @classmethod
+    def load(cls, db_path: str, size: int) -> "Sample":
+        conn = sqlite3.connect(db_path)
+        try:
+            users = [
+                _hex(r[0])
+                for r in conn.execute(
+                    "SELECT DISTINCT user_id FROM recommendations "
+                    "ORDER BY random() LIMIT ?",
+                    (size,),
+                )
+            ]
+            items = [
+                _hex(r[0])
+                for r in conn.execute(
+                    "SELECT item_id FROM recommendations "
+                    "ORDER BY random() LIMIT ?",
+                    (size,),
+                )
+            ]
+            comments = [
+                (comment_id, _hex(user_id))
+                for comment_id, user_id in conn.execute(
+                    "SELECT id, user_id FROM comments "
+                    "ORDER BY random() LIMIT ?",
+                    (size,),
+                )
+            ]
+        finally:
+            conn.close()
+        return cls(users, items, comments)
+
+
+@dataclass
+class Scenario:
+    build: Callable[[Sample, random.Random], Request]
+    # Cap for endpoints that dump whole tables.
+    max_requests: int | None = None
+
+
+def _item_ids(sample: Sample, rng: random.Random, count: int = 50) -> str:
+    return ",".join(rng.sample(sample.items, min(count, len(sample.items))))
+
+
+def _pop_comment(sample: Sample, _rng) -> tuple[int, str]:
+    # Each delete gets a comment of its own.
+    return sample.comments.pop()
+
+
+def _edit_comment(sample: Sample, rng: random.Random) -> Request:
+    comment_id, user_id = rng.choice(sample.comments)
+    return (
+        "PUT",
+        f"/comments/{comment_id}",
+        {"json": {"userId": user_id, "comment": "edited"}},
+    )
+
+
+def _delete_comment(sample: Sample, rng: random.Random) -> Request:
+    comment_id, user_id = _pop_comment(sample, rng)
+    return ("DELETE", f"/comments/{comment_id}", {"json": {"userId": user_id}})
+
+
+# Reads first; writes and deletes last so they don't skew the reads.
+SCENARIOS: dict[str, Scenario] = {
+    "assets.updoot_config": Scenario(
+        lambda s, r: ("GET", "/assets/config.json", {})
+    ),
+    "assets.updoot_js": Scenario(
+        lambda s, r: (
+            "GET",
+            "/assets/updoot.bench.js",
+            {"headers": {"Accept-Encoding": "gzip, br"}},
+        )
+    ),
+    "comments.get_comments_for_item": Scenario(
+        lambda s, r: ("GET", f"/comments/{r.choice(s.items)}", {})
+    ),
+    "comments.search_comments_for_item": Scenario(
+        lambda s, r: (
+            "GET",
+            f"/comments/{r.choice(s.items)}/search",
+            {"params": {"q": r.choice(WORDS)}},
+        )
+    ),
+    "recommendations.get_recommendations_for_item": Scenario(
+        lambda s, r: ("GET", f"/recommendations/{r.choice(s.items)}", {})
+    ),
+    "recommendations.get_grouped_recommendations": Scenario(
+        lambda s, r: (
+            "GET",
+            "/recommendations/grouped",
+            {"params": {"limit": 24, "include": "metadata"}},
+        )
+    ),
+    "recommendations.get_recommendations": Scenario(
+        lambda s, r: ("GET", "/recommendations/", {}), max_requests=5
+    ),
+    "items.get_item_summary": Scenario(
+        lambda s, r: (
+            "GET",
+            f"/items/{r.choice(s.items)}/summary",
+            {"params": {"userId": r.choice(s.users)}},
+        )
+    ),
+    "items.get_items_summary": Scenario(
+        lambda s, r: (
+            "GET",
+            "/items/summary",
+            {"params": {"ids": _item_ids(s, r), "userId": r.choice(s.users)}},
+        )
+    ),
+    "items.get_items_metadata": Scenario(
+        lambda s, r: (
+            "GET",
+            "/items/metadata",
+            {"params": {"ids": _item_ids(s, r, 24)}},
+        )
+    ),
+    "changes.get_changes": Scenario(
+        lambda s, r: (
+            "GET",
+            "/changes/",
+            {"params": {"since": 0, "itemId": r.choice(s.items)}},
+        )
+    ),
+    "changes.get_changes_head": Scenario(
+        lambda s, r: ("GET", "/changes/head", {})
+    ),
+    "admin.get_all_comments": Scenario(
+        lambda s, r: ("GET", "/admin/comments", {}), max_requests=5
+    ),
+    "admin.search_all_comments": Scenario(
+        lambda s, r: (
+            "GET",
+            "/admin/comments/search",
+            {"params": {"q": " ".join(r.sample(WORDS, 2))}},
+        )
+    ),
+    "admin.get_settings": Scenario(
+        lambda s, r: ("GET", "/admin/settings", {})
+    ),
+    "admin.get_username_cache_stats": Scenario(
+        lambda s, r: ("GET", "/admin/username-cache", {})
+    ),
+    "admin.get_read_cache_stats": Scenario(
+        lambda s, r: ("GET", "/admin/read-cache", {})
+    ),
+    "admin.get_metrics": Scenario(
+        lambda s, r: ("GET", "/admin/metrics", {}), max_requests=50
+    ),
+    "admin.save_settings": Scenario(
+        lambda s, r: (
+            "POST",
+            "/admin/settings",
+            {
+                "json": {
+                    "globalLimit": 0,
+                    "userLimits": {r.choice(s.users): 0},
+                }
+            },
+        )
+    ),
+    "recommendations.add_recommendation": Scenario(
+        lambda s, r: (
+            "POST",
+            "/recommendations/",
+            {
+                "json": {
+                    "userId": r.choice(s.users),
+                    "itemId": r.choice(s.items),
+                }
+            },
+        )
+    ),
+    "comments.add_comment": Scenario(
+        lambda s, r: (
+            "POST",
+            "/comments/",
+            {
+                "json": {
+                    "userId": r.choice(s.users),
+                    "itemId": r.choice(s.items),
+                    "comment": "benchmark comment",
+                }
+            },
+        )
+    ),
+    "comments.edit_comment": Scenario(_edit_comment),
+    "comments.delete_comment": Scenario(_delete_comment),
+    "admin.delete_admin_comment": Scenario(
+        lambda s, r: ("DELETE", f"/admin/comments/{_pop_comment(s, r)[0]}", {})
+    ),
+    "admin.delete_comments_by_user": Scenario(
+        lambda s, r: ("DELETE", f"/admin/comments/user/{s.users.pop()}", {}),
+        max_requests=50,
+    ),
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_app(args, db_path: str, jellyfin_url: str, tmp: str):
+    port = _free_port()
+    env = {
+        **os.environ,
+        "DB_PATH": db_path,
+        "JELLYFIN_URL": jellyfin_url,
+        "JELLYFIN_API_KEY": "bench",
+        "APP_ROOT_PATH": ROOT_PATH,
+        "LOG_LEVEL": "WARNING",
+        "LOG_FILE": "",
+        "METRICS_DIR": os.path.join(tmp, "metrics"),
+    }
+    if args.server == "gunicorn":
+        command = [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--bind",
+            f"127.0.0.1:{port}",
+            "--workers",
+            str(args.workers),
+            "backend:APP",
+        ]
+    else:
+        command = [
+            sys.executable,
+            "-m",
+            "flask",
+            "--app",
+            "backend",
+            "run",
+            "--port",
+            str(port),
+            "--with-threads",
+        ]
+    # Migrate and convert ids (COMPACT_IDS) first, as start.sh does.
+    subprocess.run(
+        [sys.executable, "-c", "from backend.db import init_db; init_db()"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+    # Request logs go to stdout; warnings and errors still reach stderr.
+    proc = subprocess.Popen(
+        command, cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}{ROOT_PATH}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{args.server} exited with {proc.returncode}")
+        try:
+            requests.get(f"{base_url}/assets/config.json", timeout=1)
+            return proc, base_url
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"{args.server} did not start within 60s")
+
+
+def _percentile(ordered: list[float], fraction: float) -> float:
+    # Nearest-rank percentile.
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def _run_endpoint(base_url: str, batch: list[Request], concurrency: int):
+    local = threading.local()
+
+    def send(req: Request) -> tuple[float, str]:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        method, path, kwargs = req
+        started = time.perf_counter()
+        try:
+            response = local.session.request(
+                method, base_url + path, timeout=60, **kwargs
+            )
+            status = str(response.status_code)
+        except requests.RequestException:
+            status = "error"
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(send, batch))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in results)
+    statuses = Counter(status for _, status in results)
+    return {
+        "requests": len(results),
+        "errors": sum(
+            n for s, n in statuses.items() if s == "error" or s[0] == "5"
+        ),
+        "statuses": dict(statuses),
+        "throughput_rps": round(len(results) / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_results(results: dict, baseline: dict | None) -> None:
+    print(
+        f"{'endpoint':<48} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+        f"{'errors':>6}"
+    )
+    for name, row in results["endpoints"].items():
+        line = (
+            f"{name:<48} {row['throughput_rps']:>8.1f} "
+            f"{row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['errors']:>6}"
+        )
+        old = (baseline or {}).get("endpoints", {}).get(name)
+        if old and old["p50_ms"] and old["p99_ms"]:
+            line += (
+                f"   p50 {row['p50_ms'] / old['p50_ms'] - 1:+.0%}"
+                f" p99 {row['p99_ms'] / old['p99_ms'] - 1:+.0%}"
+            )
+        print(line)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("db_path", nargs="?")
+    parser.add_argument("--scale", type=float, default=0.01)
+    parser.add_argument("--server", choices=["gunicorn", "flask"])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--jellyfin-latency-ms", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", help="comma-separated endpoint names")
+    parser.add_argument("--output", default="bench-results.json")
+    parser.add_argument("--baseline", help="earlier results to compare to")
+    args = parser.parse_args()
+    if args.server is None:
+        has_gunicorn = importlib.util.find_spec("gunicorn") is not None
+        args.server = "gunicorn" if has_gunicorn else "flask"
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    names = args.only.split(",") if args.only else list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        if args.db_path:
+            shutil.copyfile(args.db_path, db_path)
+        else:
+            seed(db_path, args.scale, args.seed)
+        sample = Sample.load(db_path, SAMPLE_SIZE)
+
+        jellyfin = FakeJellyfin(
+            ("127.0.0.1", 0),
+            sample.users,
+            latency=args.jellyfin_latency_ms / 1000,
+        )
+        jellyfin.start()
+        proc, base_url = _start_app(args, db_path, jellyfin.url, tmp)
+        try:
+            rng = random.Random(args.seed)
+            endpoints = {}
+            for name in names:
+                scenario = SCENARIOS[name]
+                count = min(args.requests, scenario.max_requests or math.inf)
+                batch = [scenario.build(sample, rng) for _ in range(count)]
+                endpoints[name] = _run_endpoint(
+                    base_url, batch, args.concurrency
+                )
+                print(f"{name}: done", file=sys.stderr)
+        finally:
+            proc.terminate()
+            proc.wait()
+            jellyfin.shutdown()
+
+    results = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in {"output", "baseline"}
+        },
+        "endpoints": endpoints,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    _print_results(results, baseline)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Time the list endpoints on items with `--rows` recommendations and comments
+each, through the Flask app in-process.
+
+Each size gets a fresh database with one item holding that many
+recommendations and comments, and reports the median time of the per-item
+lists and the full JSON dumps. The read cache is off, so every request
+queries and serializes.
+
+    python -m bench.read_path [--rows 10000 100000] [--repeat 5]
+
+Set JSON_PROVIDER=default to compare against Flask's standard-library JSON.
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+HOT_ITEM = "0" * 31 + "1"
+ENDPOINTS = (
+    f"/recommendations/{HOT_ITEM}",
+    f"/comments/{HOT_ITEM}",
+    "/recommendations/",
+    "/admin/comments",
+)
+
+
+def _seed(db_path: str, rows: int) -> None:
+    # pylint: disable-next=import-outside-toplevel
+    from backend.db import init_db
+
+    init_db()
+    user_ids = [f"{n:032x}" for n in range(1, rows + 1)]
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO users (user_id, name) VALUES (?, ?)",
+            # Every user is known, so the backfill worker stays idle.
+            ((user_id, f"user{n}") for n, user_id in enumerate(user_ids)),
+        )
+        conn.executemany(
+            "INSERT INTO recommendations (user_id, item_id) VALUES (?, ?)",
+            ((user_id, HOT_ITEM) for user_id in user_ids),
+        )
+        conn.executemany(
+            "INSERT INTO comments (user_id, item_id, comment) "
+            "VALUES (?, ?, ?)",
+            ((user_id, HOT_ITEM, "a fine film") for user_id in user_ids),
+        )
+    conn.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 100_000]
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        os.environ["DB_PATH"] = db_path
+        os.environ.setdefault("JELLYFIN_URL", "http://127.0.0.1:9")
+        os.environ.setdefault("JELLYFIN_API_KEY", "bench")
+        os.environ["USERNAME_CACHE_WARMUP"] = "false"
+        os.environ["READ_CACHE_MAX_BYTES"] = "0"
+        os.environ["LOG_LEVEL"] = "CRITICAL"
+        os.environ["LOG_FILE"] = ""
+        # pylint: disable=import-outside-toplevel
+        from backend import APP, settings
+        from backend.db import ENGINE
+
+        # pylint: enable=import-outside-toplevel
+        print(f"JSON provider: {type(APP.json).__name__}")
+        client = APP.test_client()
+        for rows in args.rows:
+            ENGINE.dispose()
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+            _seed(db_path, rows)
+            for endpoint in ENDPOINTS:
+                timings = []
+                for _ in range(args.repeat + 1):
+                    started = time.perf_counter()
+                    response = client.get(settings.app_root_path + endpoint)
+                    timings.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        print(f"{endpoint}: {response.status_code}")
+                        return 1
+                # The first request warms SQLite's page cache.
+                median = statistics.median(timings[1:])
+                print(f"{rows:>7} rows {endpoint:48} {median * 1e3:>8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Seed a SQLite database with realistic data volumes for benchmarking.
+
+Ids look like Jellyfin's (32 hex digits) and are derived from `--seed`, so
+`bench.fake_jellyfin` started with the same seed and user count knows every
+seeded user. Item popularity is skewed: a few items collect most of the
+recommendations and comments, as on a real server.
+
+    python -m bench.seed data/bench.db [--scale 1.0] [--seed 1]
+
+At `--scale 1` this writes 100k items, 5k users, 1M recommendations and
+200k comments.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+ITEMS = 100_000
+USERS = 5_000
+RECOMMENDATIONS = 1_000_000
+COMMENTS = 200_000
+
+WORDS = (
+    "great watch loved the ending slow start but worth it acting "
+    "soundtrack rewatch classic underrated overrated plot twist "
+    "cinematography dialogue pacing season finale cast"
+).split()
+
+
+def make_ids(count: int, seed: int, kind: str) -> list[str]:
+    rng = random.Random(f"{kind}:{seed}")
+    return [uuid.UUID(int=rng.getrandbits(128)).hex for _ in range(count)]
+
+
+def user_ids(count: int, seed: int) -> list[str]:
+    return make_ids(count, seed, "user")
+
+
+def item_ids(count: int, seed: int) -> list[str]:
+    return make_ids(count, seed, "item")
+
+
+def username(user_id: str) -> str:
+    return f"user-{user_id[:8]}"
+
+
+def _popular_index(rng: random.Random, count: int) -> int:
+    # Squaring a uniform sample skews towards low indexes.
+    return int(count * rng.random() ** 2)
+
+
+def _timestamp(rng: random.Random, start: datetime) -> str:
+    moment = start + timedelta(seconds=rng.randrange(365 * 86400))
+    return moment.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def _recommendations(rng, users, items, count, start, store):
+    seen: set[tuple[int, int]] = set()
+    count = min(count, len(users) * len(items))
+    while len(seen) < count:
+        pair = (rng.randrange(len(users)), _popular_index(rng, len(items)))
+        if pair in seen:
+            continue
+        seen.add(pair)
+        yield (
+            store(users[pair[0]]),
+            store(items[pair[1]]),
+            _timestamp(rng, start),
+        )
+
+
+def _comments(rng, users, items, count, store):
+    for _ in range(count):
+        user_id = rng.choice(users)
+        text = " ".join(rng.choices(WORDS, k=rng.randint(3, 40)))
+        yield (
+            store(user_id),
+            store(items[_popular_index(rng, len(items))]),
+            text,
+        )
+
+
+def seed(
+    db_path: str, scale: float = 1.0, seed_value: int = 1
+) -> dict[str, int]:
+    """
+    Create the schema at `db_path` and fill it. Returns the row counts.
+    """
+    os.environ["DB_PATH"] = db_path
+    os.environ.setdefault("JELLYFIN_URL", "http://127.0.0.1:9")
+    os.environ.setdefault("JELLYFIN_API_KEY", "bench")
+    os.environ.setdefault("LOG_FILE", "")
+    # pylint: disable=import-outside-toplevel
+    from backend.db import init_db
+    from backend.models import pack_id
+    from backend.settings import settings
+
+    # pylint: enable=import-outside-toplevel
+    init_db()
+    store = pack_id if settings.compact_ids else str
+
+    counts = {
+        "users": max(1, int(USERS * scale)),
+        "items": max(1, int(ITEMS * scale)),
+        "recommendations": int(RECOMMENDATIONS * scale),
+        "comments": int(COMMENTS * scale),
+    }
+    users = user_ids(counts["users"], seed_value)
+    items = item_ids(counts["items"], seed_value)
+    rng = random.Random(seed_value)
+    start = datetime(2025, 1, 1)
+
+    conn = sqlite3.connect(db_path)
+    with conn:
+        # Users first, so their comments are indexed with their names.
+        conn.executemany(
+            "INSERT INTO users (user_id, name) VALUES (?, ?)",
+            ((store(user_id), username(user_id)) for user_id in users),
+        )
+        conn.executemany(
+            "INSERT INTO recommendations (user_id, item_id, created_at) "
+            "VALUES (?, ?, ?)",
+            _recommendations(
+                rng, users, items, counts["recommendations"], start, store
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO comments (user_id, item_id, comment) "
+            "VALUES (?, ?, ?)",
+            _comments(rng, users, items, counts["comments"], store),
+        )
+    conn.execute("ANALYZE")
+    conn.close()
+    return counts
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("db_path")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db_path):
+        print(f"{args.db_path} already exists", file=sys.stderr)
+        return 1
+    started = time.perf_counter()
+    counts = seed(args.db_path, args.scale, args.seed)
+    print(
+        ", ".join(f"{n} {name}" for name, n in counts.items())
+        + f" in {time.perf_counter() - started:.1f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
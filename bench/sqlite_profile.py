@@ -0,0 +1,164 @@
+"""
+Compare read/write throughput of the default pysqlite setup against the
+engine profile applied by `backend.db` (WAL, busy timeout, synchronous,
+cache and mmap sizes).
+
+Several processes toggle recommendations while others read per-item lists,
+mirroring multiple gunicorn workers sharing one database file.
+
+    python -m bench.sqlite_profile [--writers 4] [--readers 4] [--seconds 5]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+os.environ.setdefault("JELLYFIN_URL", "http://127.0.0.1:8096")
+os.environ.setdefault("JELLYFIN_API_KEY", "bench")
+
+# pylint: disable=wrong-import-position
+from backend.db import sqlite_pragmas
+
+# pylint: enable=wrong-import-position
+
+USERS = 200
+ITEMS = 2000
+SEED_ROWS = 20000
+
+
+def _connect(path: str, pragmas: list[str]) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    for pragma in pragmas:
+        conn.execute(pragma)
+    return conn
+
+
+def _seed(path: str, pragmas: list[str]) -> None:
+    conn = _connect(path, pragmas)
+    conn.execute(
+        "CREATE TABLE recommendations ("
+        "user_id TEXT, item_id TEXT, username TEXT, "
+        "PRIMARY KEY (user_id, item_id))"
+    )
+    conn.execute(
+        "CREATE INDEX ix_recommendations_item_id_user_id "
+        "ON recommendations (item_id, user_id)"
+    )
+    rng = random.Random(0)
+    rows = {
+        (f"user{rng.randrange(USERS)}", f"item{rng.randrange(ITEMS)}")
+        for _ in range(SEED_ROWS)
+    }
+    conn.executemany(
+        "INSERT INTO recommendations VALUES (?, ?, 'bench')", sorted(rows)
+    )
+    conn.commit()
+    conn.close()
+
+
+def _writer(path, pragmas, deadline, results) -> None:
+    conn = _connect(path, pragmas)
+    rng = random.Random(os.getpid())
+    ops = errors = 0
+    while time.monotonic() < deadline:
+        key = (f"user{rng.randrange(USERS)}", f"item{rng.randrange(ITEMS)}")
+        try:
+            exists = conn.execute(
+                "SELECT 1 FROM recommendations "
+                "WHERE user_id = ? AND item_id = ?",
+                key,
+            ).fetchone()
+            if exists:
+                conn.execute(
+                    "DELETE FROM recommendations "
+                    "WHERE user_id = ? AND item_id = ?",
+                    key,
+                )
+            else:
+                conn.execute(
+                    "INSERT INTO recommendations VALUES (?, ?, 'bench')", key
+                )
+            conn.commit()
+            ops += 1
+        except sqlite3.OperationalError:
+            conn.rollback()
+            errors += 1
+    results.put(("write", ops, errors))
+
+
+def _reader(path, pragmas, deadline, results) -> None:
+    conn = _connect(path, pragmas)
+    rng = random.Random(os.getpid())
+    ops = errors = 0
+    while time.monotonic() < deadline:
+        try:
+            conn.execute(
+                "SELECT user_id, item_id, username FROM recommendations "
+                "WHERE item_id = ?",
+                (f"item{rng.randrange(ITEMS)}",),
+            ).fetchall()
+            ops += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    results.put(("read", ops, errors))
+
+
+def run_profile(name, pragmas, writers, readers, seconds) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        _seed(path, pragmas)
+
+        results: multiprocessing.Queue = multiprocessing.Queue()
+        deadline = time.monotonic() + seconds
+        procs = [
+            multiprocessing.Process(
+                target=target, args=(path, pragmas, deadline, results)
+            )
+            for target, count in ((_writer, writers), (_reader, readers))
+            for _ in range(count)
+        ]
+        for proc in procs:
+            proc.start()
+        totals = {"write": [0, 0], "read": [0, 0]}
+        for _ in procs:
+            kind, ops, errors = results.get(timeout=seconds + 60)
+            totals[kind][0] += ops
+            totals[kind][1] += errors
+        for proc in procs:
+            proc.join()
+
+    return {
+        "profile": name,
+        "writes_per_sec": totals["write"][0] / seconds,
+        "write_errors": totals["write"][1],
+        "reads_per_sec": totals["read"][0] / seconds,
+        "read_errors": totals["read"][1],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    for name, pragmas in (("default", []), ("tuned", sqlite_pragmas())):
+        result = run_profile(
+            name, pragmas, args.writers, args.readers, args.seconds
+        )
+        print(
+            f"{result['profile']:>8}: "
+            f"{result['writes_per_sec']:>9.0f} writes/s "
+            f"({result['write_errors']} locked), "
+            f"{result['reads_per_sec']:>9.0f} reads/s "
+            f"({result['read_errors']} locked)"
+        )
+
+
+if __name__ == "__main__":
+    main()
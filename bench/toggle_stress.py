@@ -0,0 +1,132 @@
+"""
+Concurrency stress test for the recommendation toggle.
+
+Several processes (standing in for gunicorn workers) hammer
+`POST /recommendations/` for the same few user/item pairs. Afterwards every
+pair must be present iff it was toggled successfully an odd number of times,
+and the limit counters must match the table.
+
+    python -m bench.toggle_stress [--workers 8] [--toggles 300]
+
+A smaller round runs under pytest, in tests/backend/routes.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from collections import Counter
+
+from bench.workers import run_processes
+
+PAIRS = [(f"user{u:02d}", f"item{i:02d}") for u in range(3) for i in range(3)]
+
+
+def _configure_env(db_path: str) -> None:
+    os.environ["DB_PATH"] = db_path
+    os.environ.setdefault("JELLYFIN_URL", "http://127.0.0.1:9")
+    os.environ.setdefault("JELLYFIN_API_KEY", "bench")
+    os.environ["USERNAME_CACHE_WARMUP"] = "false"
+    os.environ["LOG_LEVEL"] = "ERROR"
+
+
+def _worker(db_path: str, toggles: int, seed: int, results) -> None:
+    _configure_env(db_path)
+    # pylint: disable-next=import-outside-toplevel
+    from backend import APP, settings
+
+    client = APP.test_client()
+    url = f"{settings.app_root_path}/recommendations/"
+    rng = random.Random(seed)
+    ok: Counter = Counter()
+    failures = 0
+    for _ in range(toggles):
+        user_id, item_id = rng.choice(PAIRS)
+        response = client.post(
+            url, json={"userId": user_id, "itemId": item_id}
+        )
+        if response.status_code == 200:
+            ok[(user_id, item_id)] += 1
+        else:
+            failures += 1
+    results.put((dict(ok), failures))
+
+
+def _init_db(db_path: str, results) -> None:
+    _configure_env(db_path)
+    # pylint: disable-next=import-outside-toplevel
+    from backend.db import init_db
+
+    init_db()
+    results.put(None)
+
+
+def check_toggles(db_path: str, toggled: Counter) -> list[str]:
+    """
+    Compare the database with the successful toggles per (user, item) pair:
+    a pair must be recommended iff it was toggled an odd number of times,
+    and the limit counters must match the table. Returns the mismatches.
+    """
+    conn = sqlite3.connect(db_path)
+    present = set(conn.execute("SELECT user_id, item_id FROM recommendations"))
+    counters = dict(
+        conn.execute("SELECT user_id, total FROM recommendation_counters")
+    )
+    conn.close()
+
+    expected = {pair for pair, n in toggled.items() if n % 2 == 1}
+    actual = Counter(user_id for user_id, _ in present)
+    errors = []
+    if present != expected:
+        errors.append(
+            f"state mismatch: missing={sorted(expected - present)} "
+            f"unexpected={sorted(present - expected)}"
+        )
+    if counters.get("", 0) != len(present) or any(
+        counters.get(user_id, 0) != n for user_id, n in actual.items()
+    ):
+        errors.append(f"counter mismatch: {counters} vs {dict(actual)}")
+    return errors
+
+
+def stress(db_path: str, workers: int, toggles: int) -> list[str]:
+    """
+    Toggle from `workers` processes against a new database at `db_path`;
+    returns the failures and mismatches found. The app is only ever
+    imported in the child processes.
+    """
+    run_processes(_init_db, [(db_path,)])
+    toggled: Counter = Counter()
+    failures = 0
+    for ok, failed in run_processes(
+        _worker, [(db_path, toggles, seed) for seed in range(workers)]
+    ):
+        toggled.update(ok)
+        failures += failed
+    errors = [f"{failures} toggles failed"] if failures else []
+    return errors + check_toggles(db_path, toggled)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--toggles", type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        errors = stress(
+            os.path.join(tmp, "stress.db"), args.workers, args.toggles
+        )
+
+    total = args.workers * args.toggles
+    if errors:
+        print(f"FAIL after {total} toggles: " + "; ".join(errors))
+        return 1
+    print(f"OK: {total} toggles")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
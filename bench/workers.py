@@ -0,0 +1,33 @@
+"""
+Run bench workers in fresh processes, standing in for gunicorn workers.
+"""
+
+import multiprocessing
+from collections.abc import Callable, Iterable
+from typing import Any
+
+
+def run_processes(
+    target: Callable[..., None],
+    args_per_process: Iterable[tuple],
+    timeout: float = 600,
+) -> list[Any]:
+    """
+    Start `target(*args, results)` in a spawned process per `args` and
+    return what each put on `results`, in completion order.
+
+    Spawned rather than forked, so every process imports the app afresh
+    with the environment its `target` sets up.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=target, args=(*args, results))
+        for args in args_per_process
+    ]
+    for proc in procs:
+        proc.start()
+    collected = [results.get(timeout=timeout) for _ in procs]
+    for proc in procs:
+        proc.join()
+    return collected
@@ -0,0 +1,202 @@
+"""
+Compare per-request commits with the group-commit write queue
+(`WRITE_QUEUE`) under a burst of concurrent writes.
+
+Worker processes (standing in for gunicorn workers) each run `--threads`
+request threads that, for `--seconds`, toggle recommendations of a few hot
+items and post comments through the Flask app, like a watch party voting at
+once. Reports acknowledged writes and SQLite write commits per second and
+write latency, for each `--synchronous` setting (the queue's writer always
+commits with FULL or EXTRA). Afterwards the database is checked as in
+`bench.toggle_stress`: every pair must be recommended iff it was toggled an
+odd number of times, and the limit counters must match.
+
+    python -m bench.write_queue [--workers 2] [--threads 16] [--seconds 5]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from bench.toggle_stress import check_toggles
+from bench.workers import run_processes
+
+HOT_ITEMS = [f"item{i:02d}" for i in range(5)]
+USERS = 2000
+# Share of writes that are toggles; the rest are comments.
+TOGGLE_SHARE = 0.8
+
+
+def _configure_env(db_path: str, queued: bool, synchronous: str) -> None:
+    os.environ["DB_PATH"] = db_path
+    os.environ.setdefault("JELLYFIN_URL", "http://127.0.0.1:9")
+    os.environ.setdefault("JELLYFIN_API_KEY", "bench")
+    os.environ["USERNAME_CACHE_WARMUP"] = "false"
+    os.environ["LOG_LEVEL"] = "CRITICAL"
+    os.environ["LOG_FILE"] = ""
+    os.environ["WRITE_QUEUE"] = "true" if queued else "false"
+    os.environ["SQLITE_SYNCHRONOUS"] = synchronous
+
+
+def _count_commits(engine, counts: Counter, lock: threading.Lock) -> None:
+    # pylint: disable-next=import-outside-toplevel
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _mark_write(conn, _cursor, statement, *_args):
+        if not statement.lstrip().upper().startswith("SELECT"):
+            conn.info["wrote"] = True
+
+    @event.listens_for(engine, "commit")
+    def _count(conn):
+        if conn.info.pop("wrote", False):
+            with lock:
+                counts["commits"] += 1
+
+
+def _worker(args, seed: int, deadline: float, results) -> None:
+    _configure_env(args.db_path, args.queued, args.synchronous)
+    # pylint: disable=import-outside-toplevel
+    from backend import APP, settings
+    from backend.db import ENGINE
+
+    # pylint: enable=import-outside-toplevel
+    counts: Counter = Counter()
+    lock = threading.Lock()
+    _count_commits(ENGINE, counts, lock)
+    root = settings.app_root_path
+    toggled: Counter = Counter()
+    latencies: list[float] = []
+
+    def run(thread: int) -> None:
+        client = APP.test_client()
+        rng = random.Random(f"{seed}:{thread}")
+        ok: Counter = Counter()
+        timings = []
+        failures = 0
+        while time.time() < deadline:
+            user_id = f"user{rng.randrange(USERS):04d}"
+            item_id = rng.choice(HOT_ITEMS)
+            started = time.perf_counter()
+            if rng.random() < TOGGLE_SHARE:
+                response = client.post(
+                    f"{root}/recommendations/",
+                    json={"userId": user_id, "itemId": item_id},
+                )
+                if response.status_code == 200:
+                    ok[(user_id, item_id)] += 1
+            else:
+                response = client.post(
+                    f"{root}/comments/",
+                    json={
+                        "userId": user_id,
+                        "itemId": item_id,
+                        "comment": "so good",
+                    },
+                )
+            timings.append(time.perf_counter() - started)
+            failures += response.status_code != 200
+        with lock:
+            toggled.update(ok)
+            latencies.extend(timings)
+            counts["writes"] += len(timings)
+            counts["failures"] += failures
+
+    threads = [
+        threading.Thread(target=run, args=(n,)) for n in range(args.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put((dict(toggled), dict(counts), latencies))
+
+
+def run(
+    queued: bool, synchronous: str, workers: int, threads: int, seconds: float
+) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        args = argparse.Namespace(
+            db_path=db_path,
+            queued=queued,
+            synchronous=synchronous,
+            threads=threads,
+        )
+        # Each run gets fresh processes, so the settings above take effect.
+        run_processes(_init_db, [(args,)])
+
+        # Leave the processes time to import the app before the burst.
+        deadline = time.time() + 3 + seconds
+        toggled: Counter = Counter()
+        counts: Counter = Counter()
+        latencies: list[float] = []
+        for ok, worker_counts, timings in run_processes(
+            _worker,
+            [(args, seed, deadline) for seed in range(workers)],
+            timeout=seconds + 600,
+        ):
+            toggled.update(ok)
+            counts.update(worker_counts)
+            latencies.extend(timings)
+        mismatches = check_toggles(db_path, toggled)
+
+    latencies.sort()
+    return {
+        "writes_per_sec": counts["writes"] / seconds,
+        "commits_per_sec": counts["commits"] / seconds,
+        "failures": counts["failures"],
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p99": latencies[int(len(latencies) * 0.99)] if latencies else 0.0,
+        "consistent": not mismatches,
+    }
+
+
+def _init_db(args, results) -> None:
+    _configure_env(args.db_path, args.queued, args.synchronous)
+    # pylint: disable-next=import-outside-toplevel
+    from backend.db import init_db
+
+    init_db()
+    results.put(None)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument(
+        "--synchronous",
+        default="NORMAL,FULL",
+        help="comma-separated SQLITE_SYNCHRONOUS values",
+    )
+    args = parser.parse_args()
+
+    failed = False
+    for synchronous in args.synchronous.split(","):
+        for name, queued in (("per-request", False), ("write queue", True)):
+            result = run(
+                queued, synchronous, args.workers, args.threads, args.seconds
+            )
+            failed |= bool(result["failures"]) or not result["consistent"]
+            print(
+                f"{synchronous:>6} {name:>11}: "
+                f"{result['writes_per_sec']:>7.0f} writes/s "
+                f"{result['commits_per_sec']:>7.0f} commits/s "
+                f"p50 {result['p50'] * 1e3:>6.1f} ms "
+                f"p99 {result['p99'] * 1e3:>6.1f} ms "
+                f"({result['failures']} failed"
+                f"{'' if result['consistent'] else ', STATE MISMATCH'})"
+            )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -65,28 +65,7 @@
     let adminButton = null;
     let overlay = null;
     let adminOverlay = null;
-
-    async function fetchItemDetails(itemId) {
-      console.log('Fetching item details for itemId:', itemId);
-      try {
-        const url = `${serverUrl}/Items/${itemId}?api_key=${apiKey}`; // Fixed typo from original: 'melalui' to 'apiKey'
-        console.log('Requesting:', url);
-        const response = await fetch(url, {
-          method: 'GET',
-          headers: { 'X-Emby-Token': apiKey },
-        });
-        if (!response.ok) {
-          console.error('Fetch item details failed:', `HTTP ${response.status}`);
-          throw new Error(`HTTP ${response.status}: ${await response.text()}`);
-        }
-        const data = await response.json();
-        console.log('Item details received:', data);
-        return data;
-      } catch (error) {
-        console.error('Error fetching item details:', error.message);
-        return null;
-      }
-    }
+    const RECOMMENDATIONS_PAGE_SIZE = 24;
 
     function createRecommendButton(playButton) {
       console.log('Attempting to create Recommend button');
@@ -666,6 +645,43 @@
       });
     }
 
+    function createRecommendationCard(item, itemDetails) {
+      const { itemId, usernames } = item;
+      const card = document.createElement('div');
+      card.className = 'recommendationCard';
+      card.style.cssText = `
+                    flex: 0 0 200px;
+                    margin: 10px;
+                    background: #333;
+                    border-radius: 8px;
+                    padding: 10px;
+                    color: white;
+                    cursor: pointer;
+                    box-sizing: border-box;
+                `;
+      card.addEventListener('click', () => {
+        console.log('Navigating to item:', itemId);
+        window.location.href = `/web/index.html#!/details?id=${itemId}`;
+        overlay.style.display = 'none';
+      });
+
+      const imageUrl = itemDetails.ImageTags?.Primary
+        ? `${serverUrl}/Items/${itemId}/Images/Primary?api_key=${apiKey}`
+        : '';
+      const logoUrl = itemDetails.ImageTags?.Logo
+        ? `${serverUrl}/Items/${itemId}/Images/Logo?api_key=${apiKey}`
+        : '';
+
+      card.innerHTML = `
+                    ${imageUrl ? `<img src="${imageUrl}" style="width: 100%; border-radius: 4px;" alt="${itemDetails.Name || 'Item'}">` : ''}
+                    ${logoUrl ? `<img src="${logoUrl}" style="max-width: 100%; margin-top: 5px;" alt="Logo">` : ''}
+                    <h3 style="margin: 10px 0;">${itemDetails.Name || 'Unknown'}</h3>
+                    <p style="font-size: 12px;">${itemDetails.Overview || 'No description available'}</p>
+                    <p style="font-size: 12px; font-style: italic;">Recommended by: ${usernames.join(', ')}</p>
+                `;
+      return card;
+    }
+
     async function showRecommendationsOverlay() {
       console.log('Opening recommendations overlay for userId:', userId);
       if (!overlay) {
@@ -732,97 +748,60 @@
       }
 
       try {
-        const url = `${backendUrl}/recommendations`;
-        console.log('Fetching all recommendations from:', url, { userId });
-        const response = await fetch(url, {
-          method: 'GET',
-          headers: {
-            'Content-Type': 'application/json',
-            'X-Emby-Token': apiKey, // Added for potential backend auth
-          },
-        });
-        if (!response.ok) {
-          console.error(
-            'Fetch recommendations failed:',
-            `HTTP ${response.status}`,
-            await response.text(),
-          );
-          throw new Error(`HTTP ${response.status}: ${await response.text()}`);
-        }
-        const recommendations = await response.json();
-        console.log('Recommendations received:', recommendations);
-
-        if (!Array.isArray(recommendations) || recommendations.length === 0) {
-          console.log('No recommendations available');
-          const noRecsMessage = document.createElement('p');
-          noRecsMessage.textContent = 'No recommendations available yet.';
-          noRecsMessage.style.cssText = 'width: 100%; text-align: center;';
-          overlay.appendChild(noRecsMessage);
-          overlay.style.display = 'flex';
-          console.log('Recommendations overlay displayed with no recommendations message');
-          return;
-        }
-
-        const groupedByItem = {};
-        recommendations.forEach((rec) => {
-          if (!groupedByItem[rec.itemId]) {
-            groupedByItem[rec.itemId] = [];
+        let cursor = null;
+        let itemCount = 0;
+        do {
+          const params = new URLSearchParams({
+            limit: RECOMMENDATIONS_PAGE_SIZE,
+            include: 'metadata',
+          });
+          if (cursor) params.set('cursor', cursor);
+          const url = `${backendUrl}/recommendations/grouped?${params}`;
+          console.log('Fetching grouped recommendations from:', url, { userId });
+          const response = await fetch(url, {
+            method: 'GET',
+            headers: {
+              'Content-Type': 'application/json',
+              'X-Emby-Token': apiKey, // Added for potential backend auth
+            },
+          });
+          if (!response.ok) {
+            const body = await response.text();
+            console.error('Fetch recommendations failed:', `HTTP ${response.status}`, body);
+            throw new Error(`HTTP ${response.status}: ${body}`);
           }
-          groupedByItem[rec.itemId].push(rec.username);
-        });
-
-        for (const itemId in groupedByItem) {
-          const usernames = groupedByItem[itemId];
-          console.log('Fetching item details for itemId:', itemId);
-          const itemDetails = await fetchItemDetails(itemId);
-          if (!itemDetails) {
-            console.log('Skipping itemId due to missing details:', itemId);
-            continue;
+          const page = await response.json();
+          console.log('Recommendations page received:', page);
+
+          if (!cursor && page.items.length === 0) {
+            console.log('No recommendations available');
+            const noRecsMessage = document.createElement('p');
+            noRecsMessage.textContent = 'No recommendations available yet.';
+            noRecsMessage.style.cssText = 'width: 100%; text-align: center;';
+            overlay.appendChild(noRecsMessage);
+            overlay.style.display = 'flex';
+            console.log('Recommendations overlay displayed with no recommendations message');
+            return;
           }
 
-          const card = document.createElement('div');
-          card.className = 'recommendationCard';
-          card.style.cssText = `
-                        flex: 0 0 200px;
-                        margin: 10px;
-                        background: #333;
-                        border-radius: 8px;
-                        padding: 10px;
-                        color: white;
-                        cursor: pointer;
-                        box-sizing: border-box;
-                    `;
-          card.addEventListener('click', () => {
-            console.log('Navigating to item:', itemId);
-            window.location.href = `/web/index.html#!/details?id=${itemId}`;
-            overlay.style.display = 'none';
+          // Item details are embedded by the backend from its metadata cache.
+          page.items.forEach((item) => {
+            const itemDetails = item.item;
+            if (!itemDetails) {
+              console.log('Skipping itemId due to missing details:', item.itemId);
+              return;
+            }
+            overlay.appendChild(createRecommendationCard(item, itemDetails));
+            itemCount += 1;
+            console.log('Recommendation card added for itemId:', item.itemId);
           });
 
-          const imageUrl = itemDetails.ImageTags?.Primary
-            ? `${serverUrl}/Items/${itemId}/Images/Primary?api_key=${apiKey}`
-            : '';
-          const logoUrl = itemDetails.ImageTags?.Logo
-            ? `${serverUrl}/Items/${itemId}/Images/Logo?api_key=${apiKey}`
-            : '';
-
-          card.innerHTML = `
-                        ${imageUrl ? `<img src="${imageUrl}" style="width: 100%; border-radius: 4px;" alt="${itemDetails.Name || 'Item'}">` : ''}
-                        ${logoUrl ? `<img src="${logoUrl}" style="max-width: 100%; margin-top: 5px;" alt="Logo">` : ''}
-                        <h3 style="margin: 10px 0;">${itemDetails.Name || 'Unknown'}</h3>
-                        <p style="font-size: 12px;">${itemDetails.Overview || 'No description available'}</p>
-                        <p style="font-size: 12px; font-style: italic;">Recommended by: ${usernames.join(', ')}</p>
-                    `;
-
-          overlay.appendChild(card);
-          console.log('Recommendation card added for itemId:', itemId);
-        }
+          // Show the first page as soon as it is rendered.
+          overlay.style.display = 'flex';
+          cursor = page.nextCursor;
+        } while (cursor && overlay.style.display !== 'none');
 
-        overlay.style.display = 'flex';
-        console.log(
-          'Recommendations overlay displayed with',
-          Object.keys(groupedByItem).length,
-          'items',
-        );
+        console.log('Recommendations overlay displayed with', itemCount, 'items');
       } catch (error) {
         console.error('Error fetching recommendations:', error.message);
         const errorMessage = document.createElement('p');
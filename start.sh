@@ -2,4 +2,5 @@
 set -e
 
 python -c "from backend.db import init_db; init_db()"
+python -c "from backend.util.metrics import clear; clear()"
 exec gunicorn --bind 0.0.0.0:${PORT} backend:APP
@@ -0,0 +1,19 @@
+from backend import APP
+from backend.db import init_db
+from backend.settings import settings
+
+
+def test_metrics_are_off_without_a_token_and_need_it_otherwise(monkeypatch):
+    init_db()
+    client = APP.test_client()
+    url = f"{settings.app_root_path}/admin/metrics"
+    assert client.get(url).status_code == 404
+
+    monkeypatch.setattr(settings, "metrics_token", "s3cret")
+    assert client.get(url).status_code == 401
+    wrong = {"Authorization": "Bearer guess"}
+    assert client.get(url, headers=wrong).status_code == 401
+
+    response = client.get(url, headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    assert "# TYPE updoot_http_requests_total counter" in response.text
@@ -0,0 +1,24 @@
+from backend import APP
+from backend.db import init_db
+from backend.settings import settings
+
+
+def test_reload_config_rebuilds_the_prebuilt_body(monkeypatch):
+    init_db()
+    client = APP.test_client()
+    config_url = f"{settings.app_root_path}/assets/config.json"
+    before = client.get(config_url).json["updootSrc"]
+
+    # Stands in for an edited pyproject.toml; the memoized hash hides it.
+    monkeypatch.setattr(settings, "cache_version_override", "reloaded")
+    assert client.get(config_url).json["updootSrc"] == before
+
+    response = client.post(f"{settings.app_root_path}/admin/reload-config")
+    assert response.status_code == 200
+    after = client.get(config_url).json["updootSrc"]
+    assert after != before
+    assert response.json["cacheVersion"] in after
+
+    monkeypatch.undo()
+    client.post(f"{settings.app_root_path}/admin/reload-config")
+    assert client.get(config_url).json["updootSrc"] == before
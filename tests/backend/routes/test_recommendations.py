@@ -0,0 +1,8 @@
+from bench.toggle_stress import stress
+
+
+def test_concurrent_toggles_are_neither_lost_nor_duplicated(tmp_path):
+    # Four processes toggle the same nine pairs through the app: every pair
+    # must end up recommended iff it was toggled an odd number of times,
+    # with the limit counters matching the table.
+    assert not stress(str(tmp_path / "stress.db"), workers=4, toggles=100)
@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+USER_ID = "a" * 32
+ITEM_ID = "b" * 32
+RECORDS = [
+    {"type": "settings", "globalLimit": 3},
+    {"type": "userSetting", "userId": USER_ID, "userLimit": 5},
+    {
+        "type": "recommendation",
+        "userId": USER_ID,
+        "itemId": ITEM_ID,
+        "username": "alice",
+        "createdAt": "2025-01-01T12:00:00",
+    },
+    {
+        "type": "comment",
+        "id": 1,
+        "userId": USER_ID,
+        "itemId": ITEM_ID,
+        "username": "alice",
+        "comment": "a fine film",
+    },
+]
+
+
+def _bulk(db_path: Path, *args: str, stdin: str = "") -> str:
+    """
+    Run the bulk CLI against `db_path` and return what it wrote to stdout.
+    """
+    result = subprocess.run(
+        [sys.executable, "-m", "backend.bulk", *args],
+        input=stdin,
+        capture_output=True,
+        text=True,
+        cwd=PROJECT_ROOT,
+        env=dict(os.environ, DB_PATH=str(db_path)),
+        check=True,
+    )
+    return result.stdout
+
+
+def test_export_import_round_trip_through_standard_streams(tmp_path):
+    source = tmp_path / "source.db"
+    copy = tmp_path / "copy.db"
+    _bulk(
+        source, "import", stdin="".join(f"{json.dumps(r)}\n" for r in RECORDS)
+    )
+
+    exported = _bulk(source, "export")
+    # Nothing but NDJSON on stdout: log lines go to stderr.
+    assert [json.loads(line) for line in exported.splitlines()] == RECORDS
+
+    _bulk(copy, "import", stdin=exported)
+    assert _bulk(copy, "export") == exported
@@ -0,0 +1,115 @@
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from sqlalchemy import delete, update
+
+from backend.db import db_session, init_db
+from backend.models import ItemMetadata
+from backend.settings import settings
+from backend.util.item_metadata import get_item_metadata
+from bench.fake_jellyfin import FakeJellyfin
+
+ITEM_IDS = [f"{n:032x}" for n in range(1, 6)]
+UNKNOWN_ID = "f" * 32
+
+
+@pytest.fixture(name="jellyfin")
+def fixture_jellyfin(monkeypatch):
+    init_db()
+    db_session.execute(delete(ItemMetadata))
+    db_session.commit()
+    server = FakeJellyfin(("127.0.0.1", 0), [])
+    server.missing_items.add(UNKNOWN_ID)
+    server.start()
+    monkeypatch.setattr(settings, "jellyfin_url", server.url)
+    yield server
+    server.shutdown()
+    server.server_close()
+    db_session.rollback()
+    db_session.remove()
+
+
+def _fetched(server: FakeJellyfin) -> list[list[str]]:
+    """
+    The item ids of each `/Items` request the server has answered.
+    """
+    return [
+        parse_qs(urlparse(path).query)["Ids"][0].split(",")
+        for path in server.requests
+        if urlparse(path).path == "/Items"
+    ]
+
+
+def _age(item_id: str, name: str) -> None:
+    """
+    Make `item_id`'s cached row stale and named `name`.
+    """
+    db_session.execute(
+        update(ItemMetadata)
+        .where(ItemMetadata.item_id == item_id)
+        .values(
+            name=name, fetched_at=time.time() - 2 * settings.item_metadata_ttl
+        )
+    )
+    db_session.commit()
+
+
+def test_fresh_entries_are_served_without_calling_jellyfin(jellyfin):
+    item_id = ITEM_IDS[0]
+    first = get_item_metadata([item_id])
+    db_session.commit()
+    assert first[item_id]["Name"] == f"Item {item_id[:8]}"
+    assert first[item_id]["ImageTags"] == {"Primary": item_id[:16]}
+
+    assert get_item_metadata([item_id]) == first
+    assert _fetched(jellyfin) == [[item_id]]
+
+
+def test_stale_entries_are_refreshed(jellyfin):
+    item_id = ITEM_IDS[0]
+    get_item_metadata([item_id])
+    db_session.commit()
+    _age(item_id, "Old name")
+
+    assert get_item_metadata([item_id])[item_id]["Name"] == (
+        f"Item {item_id[:8]}"
+    )
+    assert _fetched(jellyfin) == [[item_id], [item_id]]
+
+
+def test_stale_entries_are_served_while_jellyfin_is_down(
+    jellyfin, monkeypatch
+):
+    cached, uncached = ITEM_IDS[:2]
+    get_item_metadata([cached])
+    db_session.commit()
+    _age(cached, "Old name")
+    monkeypatch.setattr(settings, "jellyfin_url", "http://127.0.0.1:9")
+
+    metadata = get_item_metadata([cached, uncached])
+    assert metadata[cached]["Name"] == "Old name"
+    assert metadata[uncached] is None
+    assert _fetched(jellyfin) == [[cached]]
+
+
+def test_unknown_items_are_cached_as_null(jellyfin):
+    assert get_item_metadata([UNKNOWN_ID]) == {UNKNOWN_ID: None}
+    db_session.commit()
+    row = db_session.get(ItemMetadata, UNKNOWN_ID)
+    assert row is not None and row.name is None
+
+    assert get_item_metadata([UNKNOWN_ID]) == {UNKNOWN_ID: None}
+    assert _fetched(jellyfin) == [[UNKNOWN_ID]]
+
+
+def test_misses_are_fetched_in_batches(jellyfin, monkeypatch):
+    monkeypatch.setattr(settings, "item_metadata_batch_size", 2)
+    get_item_metadata(ITEM_IDS[:1])
+    db_session.commit()
+
+    # Duplicates are dropped and the fresh entry isn't fetched again.
+    metadata = get_item_metadata([*ITEM_IDS, ITEM_IDS[1]])
+    assert list(metadata) == ITEM_IDS
+    assert all(metadata[item_id] is not None for item_id in ITEM_IDS)
+    assert _fetched(jellyfin) == [ITEM_IDS[:1], ITEM_IDS[1:3], ITEM_IDS[3:5]]
@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+# `backend` reads its settings once, when first imported: point it at a
+# scratch directory and an unreachable Jellyfin before any test imports it.
+# Subprocesses started by tests inherit the same environment.
+_SCRATCH = tempfile.mkdtemp(prefix="updoot-tests-")
+os.environ["DB_PATH"] = os.path.join(_SCRATCH, "recommendations.db")
+os.environ["METRICS_DIR"] = os.path.join(_SCRATCH, "metrics")
+os.environ["JELLYFIN_URL"] = "http://127.0.0.1:9"
+os.environ["JELLYFIN_API_KEY"] = "tests"
+os.environ["LOG_FILE"] = ""
+os.environ["USERNAME_CACHE_WARMUP"] = "false"